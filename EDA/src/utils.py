@@ -1,6 +1,18 @@
 import re 
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
 import tiktoken
 
+ENCODING_NAME = "cl100k_base"
+# Memo of token counts keyed by (encoding name, content hash), least recently used entries are evicted first.
+# Same helpers as src/utils/utils.py of the main tree (EDA has its own src package and cannot import it).
+TOKEN_COUNT_CACHE_SIZE = 4096
+_token_count_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+_token_count_lock = threading.Lock()
+
 def clean_text(raw_text):
      # Replace multiple consecutive newlines (\n\n, \n\n\n, etc.) with a single \n
     cleaned_text = re.sub(r'\n{2,}', '\n', raw_text)
@@ -8,12 +20,44 @@ def clean_text(raw_text):
     cleaned_text = re.sub(r'^ +', '', cleaned_text, flags=re.MULTILINE)
     return cleaned_text.strip()  # Remove leading/trailing spaces
 
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = ENCODING_NAME) -> tiktoken.Encoding:
+    """Returns the process-wide tiktoken encoding, it is built once per name."""
+    return tiktoken.get_encoding(encoding_name)
+
+def _token_cache_key(string: str, encoding_name: str) -> Tuple[str, str]:
+    digest = hashlib.sha1(string.encode("utf-8", errors="surrogatepass")).hexdigest()
+    return encoding_name, digest
+
+def _get_cached_num_tokens(key: Tuple[str, str]) -> Optional[int]:
+    with _token_count_lock:
+        num_tokens = _token_count_cache.get(key)
+        if num_tokens is not None:
+            _token_count_cache.move_to_end(key)
+        return num_tokens
+
+def _set_cached_num_tokens(key: Tuple[str, str], num_tokens: int) -> None:
+    with _token_count_lock:
+        _token_count_cache[key] = num_tokens
+        _token_count_cache.move_to_end(key)
+        while len(_token_count_cache) > TOKEN_COUNT_CACHE_SIZE:
+            _token_count_cache.popitem(last=False)
+
 def num_tokens_from_string(string: str) -> int:
     """Returns the number of tokens in a text string."""
-    encoding_name = "cl100k_base"
-    encoding = tiktoken.get_encoding(encoding_name)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return num_tokens_from_strings([string])[0]
+
+def num_tokens_from_strings(strings: List[str], num_threads: int = 8) -> List[int]:
+    """Returns the number of tokens of each text string, uncached strings are encoded with encode_batch."""
+    keys = [_token_cache_key(string, ENCODING_NAME) for string in strings]
+    counts = [_get_cached_num_tokens(key) for key in keys]
+    missing = [i for i, num_tokens in enumerate(counts) if num_tokens is None]
+    if missing:
+        encoded = get_encoding().encode_batch([strings[i] for i in missing], num_threads=num_threads)
+        for i, tokens in zip(missing, encoded):
+            counts[i] = len(tokens)
+            _set_cached_num_tokens(keys[i], counts[i])
+    return counts
 
 def get_text_from_txt(jsondict):
     outputs = []
@@ -0,0 +1,9 @@
+"""
+Agenda evaluation with LLM judges: prompts, judge backends (OpenAI, Gemini, local server),
+a rate-limited concurrent engine and the CSV pipeline shared by main.py, main_gpt.py and main_gemini.py.
+"""
+from .backends import GeminiJudge, Judge, OpenAIJudge, build_judge
+from .cache import JudgmentCache, judgment_key
+from .engine import Job, RateLimiter, run_jobs
+from .pipeline import process_evaluation
+from .prompts import build_evaluation_prompt, parse_ranking
@@ -0,0 +1,173 @@
+import json
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from .prompts import prefix_key
+
+# Rate limits of the default API tiers, overridden by "rpm"/"tpm" in the config file or on the command line
+DEFAULT_LIMITS = {
+    "gpt": {"rpm": 500, "tpm": 30000},
+    "gemini": {"rpm": 1000, "tpm": 1000000},
+    "local": {"rpm": None, "tpm": None},
+}
+DEFAULT_CONFIG_FILES = {
+    "gpt": "gpt_config.json",
+    "gemini": "gemini_config.json",
+    "local": None,
+}
+DEFAULT_LOCAL_URL = "http://127.0.0.1:8001/v1"
+
+
+class Judge:
+    """
+    A model scoring agendas. Subclasses implement acall, which sends one prompt and returns the text answer
+    (a JSON object when json_output is set, for the multi-criteria prompts), and set style, the prompt style of evaluation.prompts ('gpt' messages or 'gemini' string).
+
+    Args:
+        name (str): Name of the judge, used for its output folder.
+        model_name (str): Model of the provider.
+        rpm (Optional[float]): Requests per minute of this judge, None for no limit.
+        tpm (Optional[float]): Tokens per minute of this judge, None for no limit.
+    """
+
+    style = "gpt"
+
+    def __init__(self, name: str, model_name: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.name = name
+        self.model_name = model_name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.usage = Counter()
+
+    @property
+    def model_id(self) -> str:
+        """Identity of the judge model, part of the judgment cache key."""
+        return f"{type(self).__name__}:{self.model_name}"
+
+    async def acall(self, prompt: Any, json_output: bool = False) -> str:
+        raise NotImplementedError
+
+    def record_usage(self, prompt_tokens: Optional[int], cached_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        self.usage["calls"] += 1
+        self.usage["prompt_tokens"] += prompt_tokens or 0
+        self.usage["cached_tokens"] += cached_tokens or 0
+        self.usage["completion_tokens"] += completion_tokens or 0
+
+    def usage_report(self) -> str:
+        """Token usage of the judge so far, with the share of prompt tokens served from the provider cache."""
+        prompt_tokens = self.usage["prompt_tokens"]
+        cached_share = self.usage["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        return (f"{self.name}: {self.usage['calls']} calls, {prompt_tokens} prompt tokens "
+                f"({self.usage['cached_tokens']} cached, {cached_share:.1%}), "
+                f"{self.usage['completion_tokens']} completion tokens")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self.name!r}, model_name={self.model_name!r})"
+
+
+class OpenAIJudge(Judge):
+    """Judge on the OpenAI chat completions API, or any server compatible with it (base_url)."""
+
+    style = "gpt"
+
+    def __init__(self, name: str, model_name: str, api_key: str, base_url: Optional[str] = None,
+                 max_tokens: int = 10000, **kwargs):
+        from openai import AsyncOpenAI
+
+        super().__init__(name, model_name, **kwargs)
+        self.max_tokens = max_tokens
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    async def acall(self, prompt: Any, json_output: bool = False) -> str:
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=prompt,
+                max_tokens=self.max_tokens,
+                n=1,
+                stop=None,
+                temperature=0.01,
+                top_p=1.0,
+                frequency_penalty=0.0,
+                presence_penalty=0.0,
+                **({"response_format": {"type": "json_object"}} if json_output else {}),
+                # Routes calls sharing a 'prefix' layout prefix to the same cache (ignored by older servers)
+                **({"extra_body": {"prompt_cache_key": prefix_key(prompt)}} if prefix_key(prompt) else {}),
+            )
+            usage = response.usage
+            if usage is not None:
+                details = getattr(usage, "prompt_tokens_details", None)
+                self.record_usage(usage.prompt_tokens, getattr(details, "cached_tokens", None), usage.completion_tokens)
+            return response.choices[0].message.content.strip()  # type: ignore
+        except Exception as e:
+            raise Exception(f"API call failed: {str(e)}") from e
+
+
+class GeminiJudge(Judge):
+    """Judge on the Gemini API (google-genai)."""
+
+    style = "gemini"
+
+    def __init__(self, name: str, model_name: str, api_key: str, **kwargs):
+        from google import genai
+
+        super().__init__(name, model_name, **kwargs)
+        self.client = genai.Client(api_key=api_key)
+
+    async def acall(self, prompt: Any, json_output: bool = False) -> str:
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config={"response_mime_type": "application/json"} if json_output else None,
+            )
+            usage = response.usage_metadata
+            if usage is not None:
+                self.record_usage(usage.prompt_token_count, usage.cached_content_token_count, usage.candidates_token_count)
+            return response.text.strip()
+        except Exception as e:
+            raise Exception(f"API call failed: {str(e)}") from e
+
+
+def build_judge(
+    name: str,
+    config_path: Optional[str] = None,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    local_url: str = DEFAULT_LOCAL_URL,
+    max_tokens: int = 10000,
+) -> Judge:
+    """
+    Build a judge by name.
+
+    Args:
+        name (str): 'gpt', 'gemini' or 'local' (an OpenAI compatible server, e.g. evaluation.stub_server).
+        config_path (Optional[str]): JSON file with api_key and model_name (and optionally rpm, tpm),
+                                     defaults to gpt_config.json / gemini_config.json.
+        rpm, tpm: Override the rate limits of the config file and of DEFAULT_LIMITS.
+        local_url (str): Base URL of the local server.
+        max_tokens (int): Maximum completion tokens of the OpenAI compatible judges.
+    """
+    if name not in DEFAULT_LIMITS:
+        raise ValueError(f"Unknown judge {name}, use one of {sorted(DEFAULT_LIMITS)}")
+    config: Dict[str, Any] = {}
+    config_path = config_path or DEFAULT_CONFIG_FILES[name]
+    if config_path:
+        with open(config_path, encoding="utf8") as f:
+            config = json.load(f)
+    limits = {
+        "rpm": rpm if rpm is not None else config.get("rpm", DEFAULT_LIMITS[name]["rpm"]),
+        "tpm": tpm if tpm is not None else config.get("tpm", DEFAULT_LIMITS[name]["tpm"]),
+    }
+    if name == "gpt":
+        return OpenAIJudge(name, config["model_name"], config["api_key"], max_tokens=max_tokens, **limits)
+    if name == "gemini":
+        return GeminiJudge(name, config["model_name"], config["api_key"], **limits)
+    return OpenAIJudge(
+        name,
+        config.get("model_name", "stub"),
+        config.get("api_key", "local"),
+        base_url=config.get("base_url", local_url),
+        max_tokens=max_tokens,
+        **limits,
+    )
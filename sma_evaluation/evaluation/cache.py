@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = "eval_output/judgment_cache.sqlite"
+
+
+def judgment_key(prompt: Any, model: str, json_output: bool = False) -> str:
+    """Content hash of one judgment: the prompt text (agenda, source, criteria, task) and the judge model.
+
+    The user messages are joined, so the 'inline' and 'prefix' layouts of the same prompt share their judgments.
+
+    Args:
+        prompt (Any): The prompt string or the list of {"role", "content"} messages.
+        model (str): Identity of the judge model (see Judge.model_id).
+        json_output (bool): Whether the judgment was asked in JSON output mode.
+
+    Returns:
+        str: The sha256 hex digest of the judgment.
+    """
+    if isinstance(prompt, str):
+        content = {"prompt": prompt}
+    else:
+        content = {
+            "system": [message["content"] for message in prompt if message["role"] == "system"],
+            "user": "".join(message["content"] for message in prompt if message["role"] != "system"),
+        }
+    payload = json.dumps({**content, "model": model, "json_output": json_output}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+
+class JudgmentCache:
+    """Persistent judge results on local disk: raw response and parsed scores of each judgment key.
+
+    Args:
+        path (str): SQLite file of the cache.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS judgments ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+                "scores TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached {"response", "scores"} of a judgment, None when it was never judged."""
+        row = self.conn.execute("SELECT response, scores FROM judgments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"response": row[0], "scores": json.loads(row[1])}
+
+    def set(self, key: str, model: str, response: str, scores: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO judgments (key, model, response, scores, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, json.dumps(scores), time.time()),
+            )
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM judgments").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        self.conn.close()
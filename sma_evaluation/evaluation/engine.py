@@ -0,0 +1,200 @@
+import re
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Support Functions
+def estimate_tokens(prompt: Any) -> int:
+    """Rough token count of a prompt (a string or a list of chat messages), about 4 characters per token.
+
+    Args:
+        prompt (Any): The prompt string or the list of {"role", "content"} messages.
+
+    Returns:
+        int: The estimated number of prompt tokens.
+    """
+    if isinstance(prompt, str):
+        text = prompt
+    else:
+        text = "".join(str(message.get("content", "")) for message in prompt)
+    return len(text) // 4 + 1
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether an API error (or the error it wraps) is a rate-limit (HTTP 429) error."""
+    while error is not None:
+        if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+            return True
+        if "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error):
+            return True
+        error = error.__cause__
+    return False
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait before retrying as asked by the provider, None when the error does not say.
+
+    OpenAI sends retry-after-ms / retry-after headers, Gemini a retryDelay ("12s") in the error details.
+    """
+    while error is not None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        for name, scale in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+            try:
+                if headers.get(name):
+                    return float(headers.get(name)) / scale
+            except ValueError:
+                pass
+        match = re.search(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+        if match:
+            return float(match.group(1))
+        error = error.__cause__
+    return None
+
+
+class TokenBucket:
+    """Budget refilled continuously at rate_per_minute, holding at most one minute of budget."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the whole budget waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by every worker.
+
+    Callers are served in arrival order. A rate-limit answer from the provider pauses everyone for the
+    time the provider asked (see retry_after), not only the worker that received it.
+
+    Args:
+        rpm (Optional[float]): Requests per minute, None for no limit.
+        tpm (Optional[float]): Tokens per minute, None for no limit.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 0) -> None:
+        async with self._lock:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if self.requests is not None:
+                    wait = max(wait, self.requests.wait_time(1))
+                if self.tokens is not None:
+                    wait = max(wait, self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+@dataclass
+class Job:
+    """One judge call: key identifies the result (e.g. (item, criteria)), tokens is its budget estimate."""
+    key: Any
+    prompt: Any
+    tokens: int = 0
+
+
+async def call_with_retry(
+    call: Callable[[Any], Awaitable[str]],
+    job: Job,
+    limiter: RateLimiter,
+    max_attempts: int = 6,
+    default: Optional[str] = "0",
+) -> Optional[str]:
+    """Call the model once the budget allows it, retry rate-limit errors only.
+
+    There is no delay after a successful call, the limiter alone spaces the calls.
+    """
+    for attempt in range(max_attempts):
+        await limiter.acquire(job.tokens)
+        try:
+            return await call(job.prompt)
+        except Exception as e:
+            if not is_rate_limited(e):
+                logger.error("Error encountered for %s: %s", job.key, str(e))
+                return default
+            delay = retry_after(e)
+            if delay is None:
+                delay = (2 ** (attempt + 1)) + random.random()
+            logger.warning("Rate limit hit for %s, backing off for %.1f seconds.", job.key, delay)
+            limiter.pause(delay)
+    logger.error("Giving up on %s after %s attempts.", job.key, max_attempts)
+    return default
+
+async def run_jobs(
+    call: Callable[[Any], Awaitable[str]],
+    jobs: Iterable[Job],
+    limiter: RateLimiter,
+    max_workers: int = 8,
+    max_attempts: int = 6,
+    default: Optional[str] = "0",
+    on_result: Optional[Callable[[Job, Optional[str]], None]] = None,
+) -> Dict[Any, Optional[str]]:
+    """Run every job on a pool of max_workers workers and return {job.key: response}.
+
+    Args:
+        call: Async function sending one prompt to the model and returning its text.
+        jobs: The judge calls to make.
+        limiter: Shared rate limiter, workers wait on it so the budget stays saturated but never exceeded.
+        max_workers: Calls in flight at the same time.
+        max_attempts: Attempts per job on rate-limit errors.
+        default: Response of a job that failed (e.g. None to tell failures apart).
+        on_result: Called with each job and its response as soon as it is done (e.g. to write results).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    total = queue.qsize()
+    results: Dict[Any, Optional[str]] = {}
+
+    async def worker():
+        while not queue.empty():
+            job = queue.get_nowait()
+            results[job.key] = await call_with_retry(call, job, limiter, max_attempts, default)
+            if on_result is not None:
+                on_result(job, results[job.key])
+            if len(results) % 50 == 0 or len(results) == total:
+                logger.info("Judged %s/%s", len(results), total)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(max_workers, total)))))
+    return results
+
+def evaluate(
+    call: Callable[[Any], Awaitable[str]],
+    jobs: List[Job],
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    max_workers: int = 8,
+    **kwargs,
+) -> Dict[Any, str]:
+    """Synchronous entry point of run_jobs with a new RateLimiter(rpm, tpm)."""
+    async def main():
+        return await run_jobs(call, jobs, RateLimiter(rpm, tpm), max_workers=max_workers, **kwargs)
+    return asyncio.run(main())
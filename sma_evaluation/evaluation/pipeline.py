@@ -0,0 +1,291 @@
+import os
+import asyncio
+import functools
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils import read_yaml, read_json
+from .backends import DEFAULT_LIMITS, DEFAULT_LOCAL_URL, Judge, build_judge
+from .cache import DEFAULT_CACHE_PATH, JudgmentCache, judgment_key
+from .engine import Job, RateLimiter, estimate_tokens, run_jobs
+from .prompts import build_criteria_groups, build_criteria_prompts, has_ranking, parse_ranking, parse_rankings
+
+logger = logging.getLogger(__name__)
+
+PATH = 'dataset/'
+TRANSCRIPT_DIR = f'{PATH}/AMI_MS_Cleaned/'
+RELATED_DOCS_DIR = f'{PATH}/truncated_single_input_agenda/'
+PERSONA = 'Unknown Role'
+
+
+def load_items(source_dir: str, transcript_dir: str, related_docs_dir: str) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    Read every agenda file of source_dir with its transcript and related documents, once for all judges.
+
+    Returns:
+        The items {file: {"agenda", "transcript", "related_docs"}} and the roles of all meeting participants.
+    """
+    items: Dict[str, Dict[str, Any]] = {}
+    all_roles: Set[str] = set()
+    for item in os.listdir(source_dir):
+        try:
+            jsondict = read_json(os.path.join(os.getcwd(), source_dir, item), keys=("agenda", "Meeting Participants"))
+            for participant in jsondict.get('Meeting Participants') or []:
+                all_roles.add(participant.get('role', 'Unknown Role'))
+            transcript_dict = read_json(os.path.join(os.getcwd(), transcript_dir, item), keys=("transcript",))
+            related_docs_dict = read_json(
+                os.path.join(os.getcwd(), related_docs_dir, item), keys=("truncate_shared_docs",))
+            items[item] = {
+                "agenda": jsondict["agenda"],
+                "transcript": transcript_dict["transcript"],
+                "related_docs": related_docs_dict["truncate_shared_docs"],
+            }
+        except Exception as e:
+            logger.exception("Error occurred with file: %s", item)
+    return items, all_roles
+
+def build_jobs(judge: Judge, items: Dict[str, Dict[str, Any]], eval_criteria: Dict[str, str],
+               completion_tokens: int = 1000, multi_criteria: bool = False, layout: str = "inline") -> List[Job]:
+    """
+    Jobs of this judge keyed (judge name, item, criteria): one per criteria, or with multi_criteria one per
+    source (transcript criteria, _DOC criteria) where criteria is the tuple of criteria names.
+
+    With layout='prefix' the jobs are ordered criteria by criteria over all items: the first call of an item
+    puts its prefix in the provider cache before the calls of the other criteria reuse it.
+    """
+    jobs = []
+    for item, data in items.items():
+        if multi_criteria:
+            prompts = build_criteria_groups(data["transcript"], data["related_docs"], data["agenda"], PERSONA,
+                                            eval_criteria, style=judge.style, layout=layout)
+        else:
+            prompts = build_criteria_prompts(data["transcript"], data["related_docs"], data["agenda"], PERSONA,
+                                             eval_criteria, style=judge.style, layout=layout)
+        for position, (criteria, prompt) in enumerate(prompts.items()):
+            num_criteria = len(criteria) if isinstance(criteria, tuple) else 1
+            tokens = estimate_tokens(prompt) + completion_tokens * num_criteria
+            jobs.append((position, Job(key=(judge.name, item, criteria), prompt=prompt, tokens=tokens)))
+    if layout == "prefix":
+        jobs.sort(key=lambda job: job[0])
+    return [job for _, job in jobs]
+
+def parse_job_scores(criteria, response: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Scores of a job answer: {criteria: score} of one criteria or of a tuple of criteria.
+    None when the job failed (no response) or its answer holds no JSON object to read the scores from.
+    """
+    if response is None or not has_ranking(response, multi_criteria=isinstance(criteria, tuple)):
+        return None
+    if isinstance(criteria, tuple):
+        return parse_rankings(response, criteria)
+    return parse_ranking(response, criteria)
+
+def failed_job_scores(criteria) -> Dict[str, Any]:
+    """Scores of a failed job, 0 for each of its criteria."""
+    if isinstance(criteria, tuple):
+        return {name: 0 for name in criteria}
+    return {criteria: 0}
+
+
+class CsvResultWriter:
+    """
+    Score rows of one judge. The row of an item is appended as soon as all its criteria are scored,
+    an item with a failed judgment is not written so that a rerun judges it again.
+
+    Args:
+        path (str): Output CSV file.
+        eval_criteria (Dict[str, str]): Criteria of the run, in column order of the scores.
+        all_roles (Set[str]): Roles of the meeting participants, one agenda/score column pair each.
+        resume (bool): Keep the rows of an existing CSV and skip their items (done), else start a new file.
+    """
+
+    def __init__(self, path: str, eval_criteria: Dict[str, str], all_roles: Set[str], resume: bool = True):
+        self.path = path
+        self.eval_criteria = eval_criteria
+        self.all_roles = all_roles
+        self.scores: Dict[str, Dict[str, Any]] = {}
+        self.failed: Set[str] = set()
+        self.done: Set[str] = set()
+        self.header_written = False
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.done = set(pd.read_csv(path, usecols=['Item'], dtype=str)['Item'])
+            self.header_written = True
+        else:
+            with open(path, 'w') as f:
+                pass
+
+    def add(self, item: str, agenda: str, new_scores: Dict[str, Any], failed: bool = False) -> None:
+        logger.info("Scores of %s: %s", item, new_scores)
+        scores = self.scores.setdefault(item, {})
+        scores.update(new_scores)
+        if failed:
+            self.failed.add(item)
+        if len(scores) < len(self.eval_criteria):
+            return
+        if item in self.failed:
+            logger.warning("%s has failed judgments, not written to %s (rerun to judge it again)", item, self.path)
+            return
+        row = {
+            'Item': item,
+        }
+
+        # Initialize all role columns with empty strings or default values
+        for r in self.all_roles:
+            row[f'agenda_{r}'] = ''
+            row[f'Score_{r}'] = ''
+
+        # Assign the current role's agenda and score, criteria in config order
+        row[f'agenda_{PERSONA}'] = agenda
+        row[f'Score_{PERSONA}'] = {criteria: scores[criteria] for criteria in self.eval_criteria}
+
+        # Save to CSV, appending and avoiding header if already written
+        with open(self.path, 'a', encoding='utf8', newline='') as f:
+            pd.DataFrame([row]).to_csv(f, header=not self.header_written, index=False)
+            self.header_written = True
+        self.done.add(item)
+
+
+async def judge_all(
+    judges: List[Judge],
+    items: Dict[str, Dict[str, Any]],
+    eval_criteria: Dict[str, str],
+    writers: Dict[str, CsvResultWriter],
+    max_workers: int = 8,
+    completion_tokens: int = 1000,
+    multi_criteria: bool = False,
+    layout: str = "inline",
+    cache: Optional[JudgmentCache] = None,
+) -> None:
+    """
+    Run the judges side by side, each with its own rate limiter and worker pool.
+    With multi_criteria each judge scores all the criteria of a source in one JSON-output call.
+    layout is the prompt layout of evaluation.prompts, the token usage of each judge is logged at the end.
+    Items already in a judge's CSV are skipped, judgments found in the cache are not sent again.
+    """
+    judges_by_name = {judge.name: judge for judge in judges}
+
+    def on_result(job: Job, response: Optional[str]) -> None:
+        name, item, criteria = job.key
+        judge = judges_by_name[name]
+        scores = parse_job_scores(criteria, response)
+        if scores is None:
+            # Failed after retries or unreadable answer: scored 0, not cached, judged again on the next run
+            writers[name].add(item, items[item]["agenda"], failed_job_scores(criteria), failed=True)
+            return
+        if cache is not None:
+            cache.set(judgment_key(job.prompt, judge.model_id, multi_criteria), judge.model_id, response, scores)
+        writers[name].add(item, items[item]["agenda"], scores)
+
+    async def run(judge: Judge) -> None:
+        writer = writers[judge.name]
+        todo = {item: data for item, data in items.items() if item not in writer.done}
+        jobs = []
+        for job in build_jobs(judge, todo, eval_criteria, completion_tokens, multi_criteria, layout):
+            cached = cache.get(judgment_key(job.prompt, judge.model_id, multi_criteria)) if cache is not None else None
+            # Entries of unreadable answers (cached by older runs) are judged again
+            if cached is None or parse_job_scores(job.key[2], cached["response"]) is None:
+                jobs.append(job)
+            else:
+                writer.add(job.key[1], todo[job.key[1]]["agenda"], cached["scores"])
+        logger.info("Judge %s: %s items to score (%s already in %s), %s calls...",
+                    judge.name, len(todo), len(items) - len(todo), writer.path, len(jobs))
+        await run_jobs(functools.partial(judge.acall, json_output=multi_criteria), jobs,
+                       RateLimiter(judge.rpm, judge.tpm), max_workers=max_workers, default=None, on_result=on_result)
+        logger.info("Usage of judge %s", judge.usage_report())
+
+    await asyncio.gather(*(run(judge) for judge in judges))
+
+def process_evaluation(args):
+    """
+    Process the evaluation with given arguments for source_dir, output_path, output_csv and judges.
+
+    With one judge the scores go to <output_path>/<output_csv>, with several to <output_path>/<judge>/<output_csv>.
+
+    Args:
+        args: Parsed arguments of build_parser
+    """
+    eval_criteria = read_yaml("config.yaml")["metrics"][args.doctype]
+    judges = [
+        build_judge(
+            name,
+            config_path=getattr(args, f"{name}_config"),
+            rpm=args.rpm,
+            tpm=args.tpm,
+            local_url=args.local_url,
+            max_tokens=args.max_tokens,
+        )
+        for name in dict.fromkeys(args.judges)
+    ]
+
+    logger.info("Reading dataset...")
+    items, all_roles = load_items(args.source_dir, args.transcript_dir, args.related_docs_dir)
+    print(len(items))
+
+    writers = {}
+    for judge in judges:
+        out_path = args.output_path if len(judges) == 1 else os.path.join(args.output_path, judge.name)
+        writers[judge.name] = CsvResultWriter(
+            os.path.join(out_path, args.output_csv), eval_criteria, all_roles, resume=not args.overwrite)
+    cache = None if args.no_cache else JudgmentCache(args.cache_path)
+    asyncio.run(judge_all(
+        judges, items, eval_criteria, writers, args.max_workers, args.completion_tokens, args.multi_criteria,
+        args.prompt_layout, cache))
+    if cache is not None:
+        logger.info("Judgment cache: %s", cache.stats())
+        cache.close()
+
+def build_parser(description: str, default_judges: List[str]) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--source-dir', type=str, default=f'{PATH}/truncated_single_input_agenda/',
+                       help='Directory containing source agenda files')
+    parser.add_argument('--output-path', type=str, default='eval_output/',
+                       help='Path to save evaluation output')
+    parser.add_argument('--output-csv', type=str, default='single_output.csv',
+                       help='Name of the output CSV file')
+    parser.add_argument('--doctype', type=str, choices=['transcript', 'shared_docs'], default='transcript',
+                        help='Document type to evaluate with agendas (must be "transcript" or "shared_docs")')
+    parser.add_argument('--judges', type=str, nargs='+', choices=sorted(DEFAULT_LIMITS), default=default_judges,
+                        help='Judges scoring the same agendas in one pass')
+    parser.add_argument('--gpt-config', type=str, default=None,
+                        help='Name of the gpt configuration file (default gpt_config.json)')
+    parser.add_argument('--gemini-config', type=str, default=None,
+                        help='Name of the gemini configuration file (default gemini_config.json)')
+    parser.add_argument('--local-config', type=str, default=None,
+                        help='Optional configuration file of the local judge (model_name, base_url)')
+    parser.add_argument('--local-url', type=str, default=DEFAULT_LOCAL_URL,
+                        help='Base URL of the local judge server (python -m evaluation.stub_server)')
+    parser.add_argument('--transcript-dir', type=str, default=TRANSCRIPT_DIR,
+                        help='Directory containing the transcript files')
+    parser.add_argument('--related-docs-dir', type=str, default=RELATED_DOCS_DIR,
+                        help='Directory containing the related documents files')
+    parser.add_argument('--rpm', type=float, default=None,
+                        help='Requests per minute of each judge (default from its config file or API tier)')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Tokens per minute of each judge (default from its config file or API tier)')
+    parser.add_argument('--max-workers', type=int, default=8,
+                        help='Judge calls in flight at the same time, per judge')
+    parser.add_argument('--max-tokens', type=int, default=10000,
+                        help='Maximum completion tokens of a judge call (OpenAI compatible judges)')
+    parser.add_argument('--completion-tokens', type=int, default=1000,
+                        help='Expected completion tokens of a judge call, counted in the tokens-per-minute budget')
+    parser.add_argument('--multi-criteria', action='store_true',
+                        help='Score all transcript criteria (and all _DOC criteria) of an agenda in one call')
+    parser.add_argument('--prompt-layout', type=str, choices=['inline', 'prefix'], default='inline',
+                        help='"prefix" sends the source material as a fixed prefix message so the provider caches it')
+    parser.add_argument('--cache-path', type=str, default=DEFAULT_CACHE_PATH,
+                        help='SQLite file of the judgment cache, judgments already made are not sent again')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Judge everything again, without reading or writing the judgment cache')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Start a new output CSV instead of resuming (skipping the items it already holds)')
+    return parser
+
+def main(default_judges: List[str] = ("gpt",), description: str = "Evaluate agendas based on transcripts and documents"):
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser(description, list(default_judges)).parse_args()
+    process_evaluation(args)
@@ -0,0 +1,259 @@
+import re
+import json
+import hashlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Texts of the judge prompts, kept byte for byte as tuned for each judge ("gpt" and "gemini" styles)
+ROLE = """You are an expert in the field of meeting agendas and are tasked with evaluating the quality of the following agenda.
+            Score the agenda according to the scoring criteria with a Likert score between 1 (worst) to 5 (best).
+            Your evaluation must be based strictly on the provided materials and criteria, with no assumptions beyond the given content.
+            """
+
+GPT_TRANSCRIPT_TASK = """Your task is to rank the agenda based on the criteria provided.
+                The agenda you evaluate should align with the given transcript and the target persona.
+                Carefully assess whether the agenda meets the given criteria and fits the intended purpose.
+                Remember to consider the quality of the agenda and how well it outlines the key discussion points of the meeting as reflected in the transcript.
+                First, provide an argumentation for your ranking. Use chain-of-thought reasoning and evaluate step by step.
+                Return a JSON object with the ranking for the evaluation criteria.
+                The output should be in the following format:
+                <explanation, step-by-step> \n\n ! \n\n <json object>
+                The JSON object should follow the structure json \n {<evaluation criteria> : <Likert Score>} \n
+                The JSON object should only contain the single Likert score for the currently assessed criteria.
+                """
+
+GPT_DOCUMENTS_TASK = """Your task is to evaluate the agenda based solely on the provided related documents and criteria.
+                The agenda must align precisely with the content, objectives, and intent of the related documents, as interpreted for the target persona.
+                For each step in the criteria:
+                1. Explicitly compare every agenda item to the related documents.
+                2. Identify matches (topics present in both), omissions (document topics missing from the agenda), and unsupported content (agenda topics not in the documents).
+                3. Assess the severity of any misalignment using the provided scoring guidance (1 for severe, 2 for major, 3 for moderate, 4 for minor, 5 for perfect).
+                Use chain-of-thought reasoning to justify your score step-by-step, addressing each criterion point explicitly.
+                Assign a single Likert score from 1 (worst) to 5 (best) based on the cumulative alignment with the related documents.
+                Return a JSON object with the ranking for the evaluation criteria.
+                The output should be in the following format:
+                <explanation, step-by-step> \n\n ! \n\n <json object>
+                The JSON object should follow the structure json \n {<evaluation criteria> : <Likert Score>} \n
+                The JSON object should only contain the single Likert score for the currently assessed criteria.
+                """
+
+GEMINI_TRANSCRIPT_TASK = """Your task is to evaluate the agenda based solely on the provided transcript and criteria.
+                The agenda must align with the transcript’s content and the target persona’s perspective.
+                Follow these steps:
+                1. Provide a step-by-step explanation using chain-of-thought reasoning to justify your score.
+                2. Assign a single Likert score from 1 (worst) to 5 (best) based on the criteria.
+                3. Return your response in this exact format:
+                   <Step-by-step explanation> \n\n ! \n\n ```json\n{"<criteria>": <score>}\n```
+                Example output:
+                   Step 1: <reasoning> \n Step 2: <reasoning> \n Score: 4 \n\n ! \n\n ```json\n{"FAC": 4}\n```
+                Do not deviate from this format. Ensure the JSON object contains only the specified criteria and score.
+                """
+
+GEMINI_DOCUMENTS_TASK = """Your task is to evaluate the agenda based solely on the provided related documents and criteria.
+                The agenda must align precisely with the content, objectives, and intent of the related documents.
+                Follow these steps:
+                1. Explicitly compare every agenda item to the related documents.
+                2. Identify matches, omissions, and unsupported content.
+                3. Assess misalignment severity (1=severe, 2=major, 3=moderate, 4=minor, 5=perfect).
+                4. Provide a step-by-step explanation using chain-of-thought reasoning.
+                5. Assign a single Likert score from 1 (worst) to 5 (best).
+                6. Return your response in this exact format:
+                   <Step-by-step explanation> \n\n ! \n\n ```json\n{"<criteria>": <score>}\n```
+                Example output:
+                   Step 1: <reasoning> \n Step 2: <reasoning> \n Score: 3 \n\n ! \n\n ```json\n{"FAC_DOC": 3}\n```
+                Do not deviate from this format. Ensure the JSON object contains only the specified criteria and score.
+                """
+
+# Multi-criteria mode: every criteria of one source judged in a single call answering a JSON object
+MULTI_TRANSCRIPT_TASK = """Your task is to evaluate the agenda against each of the criteria provided, based solely on the provided transcript.
+                The agenda must align with the transcript's content and the target persona's perspective.
+                Score each of these criteria: {names}.
+                For each criteria, independently of the others:
+                1. Provide a short step-by-step explanation using chain-of-thought reasoning to justify your score.
+                2. Assign a single Likert score from 1 (worst) to 5 (best) based on that criteria.
+                Return only a JSON object with one entry per criteria, in this format:
+                {{"<criteria>": {{"explanation": "<step-by-step explanation>", "score": <Likert score>}}}}
+                """
+
+MULTI_DOCUMENTS_TASK = """Your task is to evaluate the agenda against each of the criteria provided, based solely on the provided related documents.
+                The agenda must align precisely with the content, objectives, and intent of the related documents.
+                Score each of these criteria: {names}.
+                For each criteria, independently of the others:
+                1. Explicitly compare every agenda item to the related documents.
+                2. Identify matches, omissions, and unsupported content.
+                3. Assess misalignment severity (1=severe, 2=major, 3=moderate, 4=minor, 5=perfect).
+                4. Provide a short step-by-step explanation using chain-of-thought reasoning.
+                5. Assign a single Likert score from 1 (worst) to 5 (best).
+                Return only a JSON object with one entry per criteria, in this format:
+                {{"<criteria>": {{"explanation": "<step-by-step explanation>", "score": <Likert score>}}}}
+                """
+
+TASKS = {
+    "gpt": {"transcript": GPT_TRANSCRIPT_TASK, "documents": GPT_DOCUMENTS_TASK},
+    "gemini": {"transcript": GEMINI_TRANSCRIPT_TASK, "documents": GEMINI_DOCUMENTS_TASK},
+}
+
+
+def _layout_prompt(source_label, source, details, task, style="gpt", layout="inline"):
+    """
+    Assemble a judge prompt: role, source material, the agenda/criteria/persona details, then the task.
+
+    Both layouts start with the role and the source, the part shared by every agenda and criteria of a meeting.
+    With layout='prefix' the source is a message of its own, so the chat prompt is this fixed prefix followed
+    by one message that differs per call (see prefix_key). The 'gemini' string is the same in both layouts.
+    """
+    source_material = f"{source_label}: <{source}>\n"
+    if style == "gemini":
+        # Combine into a single string for Gemini API
+        return f"{ROLE}\n\n{source_material}{details}\n\n{task}"
+    if layout == "prefix":
+        return [
+            {"role": "system", "content": f"{ROLE}"},
+            {"role": "user", "content": source_material},
+            {"role": "user", "content": f"{details}\n\n{task}"},
+        ]
+    return [
+        {"role": "system", "content": f"{ROLE}"},
+        {"role": "user", "content": f"{source_material}{details}\n\n{task}"},
+    ]
+
+def prefix_key(prompt) -> Optional[str]:
+    """Hash of the fixed prefix of a 'prefix' layout chat prompt (all messages but the last), else None."""
+    if isinstance(prompt, str) or len(prompt) < 3:
+        return None
+    return hashlib.sha256(json.dumps(prompt[:-1], sort_keys=True).encode("utf8")).hexdigest()[:32]
+
+def build_evaluation_prompt(source, agenda, criteria, persona, source_type="transcript", style="gpt", layout="inline"):
+    """
+    Build the judge prompt based on the input data, supporting either transcript or related documents.
+
+    Args:
+        source (str): The transcript or related documents content.
+        agenda (str): The agenda to evaluate.
+        criteria (str): The evaluation criteria (e.g., FAC, INF_DOC, etc.).
+        persona (str): The target persona for the agenda.
+        source_type (str): 'transcript' for transcript-based criteria, 'documents' for document-based criteria.
+                          Defaults to 'transcript'.
+        style (str): 'gpt' returns chat messages, 'gemini' a single string, each with its own task wording.
+        layout (str): 'inline' or 'prefix' (the source in its own message, for provider prompt caching).
+    """
+    source_label = "Transcript" if source_type == "transcript" else "Related Documents"
+    details = (
+        f"Agenda: <{agenda}>\n"
+        f"Criteria: <{criteria}>\n"
+        f"Target Persona: <{persona}>\n"
+    )
+    return _layout_prompt(source_label, source, details, TASKS[style][source_type], style=style, layout=layout)
+
+def build_multi_criteria_prompt(source, agenda, criteria, persona, source_type="transcript", style="gpt", layout="inline"):
+    """
+    Build one judge prompt scoring several criteria of the same source at once.
+
+    Args:
+        source (str): The transcript or related documents content.
+        agenda (str): The agenda to evaluate.
+        criteria (Dict[str, str]): The evaluation criteria and their descriptions.
+        persona (str): The target persona for the agenda.
+        source_type (str): 'transcript' or 'documents'.
+        style (str): 'gpt' returns chat messages, 'gemini' a single string.
+        layout (str): 'inline' or 'prefix', see build_evaluation_prompt.
+    """
+    source_label = "Transcript" if source_type == "transcript" else "Related Documents"
+    descriptions = "\n".join(f"<{name}: {description}>" for name, description in criteria.items())
+    details = (
+        f"Agenda: <{agenda}>\n"
+        f"Criteria:\n{descriptions}\n"
+        f"Target Persona: <{persona}>\n"
+    )
+    task_template = MULTI_TRANSCRIPT_TASK if source_type == "transcript" else MULTI_DOCUMENTS_TASK
+    task = task_template.format(names=", ".join(criteria))
+    return _layout_prompt(source_label, source, details, task, style=style, layout=layout)
+
+def build_criteria_groups(transcript, related_docs, agenda, persona, eval_criteria, style="gpt",
+                          layout="inline") -> Dict[Tuple[str, ...], Any]:
+    """
+    Build one multi-criteria prompt for the transcript criteria and one for the _DOC criteria,
+    keyed by the tuple of their criteria names. A group without criteria has no prompt.
+    """
+    groups = {
+        "transcript": (transcript, {c: d for c, d in eval_criteria.items() if not c.endswith("_DOC")}),
+        "documents": (related_docs, {c: d for c, d in eval_criteria.items() if c.endswith("_DOC")}),
+    }
+    return {
+        tuple(criteria): build_multi_criteria_prompt(
+            source, agenda, criteria, persona, source_type=source_type, style=style, layout=layout)
+        for source_type, (source, criteria) in groups.items()
+        if criteria
+    }
+
+def build_criteria_prompts(transcript, related_docs, agenda, persona, eval_criteria, style="gpt",
+                           layout="inline") -> Dict[str, Any]:
+    """
+    Build one evaluation prompt per criteria, keyed by criteria.
+    Criteria ending with _DOC are judged against the related documents, the others against the transcript.
+    """
+    prompts = {}
+    for criteria, description in eval_criteria.items():
+        if criteria.endswith("_DOC"):
+            prompts[criteria] = build_evaluation_prompt(
+                related_docs, agenda, description, persona, source_type="documents", style=style, layout=layout)
+        else:
+            prompts[criteria] = build_evaluation_prompt(
+                transcript, agenda, description, persona, source_type="transcript", style=style, layout=layout)
+    return prompts
+
+def _ranking_json(rankings) -> Optional[Dict[str, Any]]:
+    # JSON object of a single-criteria answer, in its ```json block
+    match = re.search(r'```json\n({.*?})\n```', rankings, re.DOTALL)
+    if match:
+        try:
+            json_object = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            return None
+        if isinstance(json_object, dict) and json_object:
+            return json_object
+    return None
+
+def _rankings_json(rankings) -> Optional[Dict[str, Any]]:
+    # JSON object of a multi-criteria answer: the whole answer, a ```json block or the text between braces
+    match = re.search(r'```json\n({.*?})\n```', rankings, re.DOTALL)
+    candidates = [rankings, match.group(1) if match else None, rankings[rankings.find("{"):rankings.rfind("}") + 1]]
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            json_object = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return json_object if isinstance(json_object, dict) else None
+    return None
+
+def has_ranking(rankings, multi_criteria: bool = False) -> bool:
+    """
+    Whether a judge answer holds the JSON object parse_ranking (or parse_rankings) reads,
+    without it every score of the answer is 0.
+    """
+    return (_rankings_json(rankings) if multi_criteria else _ranking_json(rankings)) is not None
+
+def parse_ranking(rankings, criteria="OOO"):
+    """
+    Parse the ranking response of a judge, 0 when no JSON object is found.
+    """
+    json_object = _ranking_json(rankings)
+    if json_object is None:
+        return {criteria: 0}
+    key, value = next(iter(json_object.items()))
+    return {criteria: value}
+
+def parse_rankings(rankings, criteria_names: Iterable[str]) -> Dict[str, Any]:
+    """
+    Parse the JSON answer of a multi-criteria prompt, {criteria: score} with 0 for a missing criteria.
+    The JSON object may be the whole answer, in a ```json block or surrounded by text.
+    """
+    json_object = _rankings_json(rankings)
+    scores = {}
+    for name in criteria_names:
+        value = json_object.get(name) if isinstance(json_object, dict) else None
+        if isinstance(value, dict):
+            value = value.get("score")
+        scores[name] = value if value is not None else 0
+    return scores
@@ -0,0 +1,85 @@
+"""
+Stand-in for the judge APIs when testing offline: an OpenAI compatible /v1/chat/completions endpoint
+answering every prompt with a deterministic Likert score in the format the judges are asked for.
+
+    python -m evaluation.stub_server --port 8001
+    python main.py --judges local --source-dir dataset/truncated_single_input_agenda/
+"""
+import re
+import json
+import time
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _score(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf8")).hexdigest(), 16) % 5 + 1
+
+def stub_answer(messages, json_output: bool = False) -> str:
+    """Same prompt, same score (1 to 5). With json_output, one entry per criteria of a multi-criteria prompt."""
+    text = json.dumps(messages, sort_keys=True)
+    if json_output:
+        contents = "\n".join(str(message.get("content", "")) for message in messages)
+        match = re.search(r"Score each of these criteria: ([^\n.]+)\.", contents)
+        names = match.group(1).split(", ") if match else ["score"]
+        return json.dumps({name: {"explanation": "stub judge", "score": _score(text + name)} for name in names})
+    score = _score(text)
+    return f"Step 1: stub judge \n Score: {score} \n\n ! \n\n ```json\n{{\"score\": {score}}}\n```"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    # Prefixes (all messages but the last) already seen, reported as cached tokens like the OpenAI API
+    seen_prefixes = set()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        json_output = (body.get("response_format") or {}).get("type") == "json_object"
+        content = stub_answer(body.get("messages", []), json_output)
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        prefix = json.dumps(body.get("messages", [])[:-1], sort_keys=True)
+        cached_tokens = len(prefix) // 4 if prefix in self.seen_prefixes else 0
+        self.seen_prefixes.add(prefix)
+        completion_tokens = len(content) // 4
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in judge server for offline evaluation runs")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds to wait before answering, to mimic a remote API')
+    args = parser.parse_args()
+    StubHandler.latency = args.latency
+    print(f"Stub judge on http://{args.host}:{args.port}/v1")
+    ThreadingHTTPServer((args.host, args.port), StubHandler).serve_forever()
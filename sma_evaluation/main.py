@@ -0,0 +1,7 @@
+# Run one or several judges over the same agendas in one pass, e.g.
+#   python main.py --judges gpt gemini --source-dir dataset/generate_rag_multi_input_agenda --doctype shared_docs
+from evaluation.pipeline import main
+
+
+if __name__ == "__main__":
+    main(default_judges=["gpt", "gemini"], description="Evaluate agendas with several judges in one pass")
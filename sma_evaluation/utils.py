@@ -1,18 +1,78 @@
 import yaml
 import json
-from typing import Dict, Any
+import ijson
+from collections.abc import Mapping
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+_SCALAR_EVENTS = ("string", "number", "boolean", "null", "end_map", "end_array")
 
 
 # Support Functions
-def read_json(file_path: str) -> Dict[str, Any]:
+def read_json_keys(file_path: str, keys: Iterable[str]) -> Dict[str, Any]:
+    """Stream a JSON file and build only the requested top-level keys.
+
+    The other values are skipped without being materialized and reading stops once every key is found.
+
+    Args:
+        file_path (str): Path to the JSON file.
+        keys (Iterable[str]): Top-level keys to build.
+
+    Returns:
+        Dict[str, Any]: The requested keys found in the file.
+    """
+    wanted = set(keys)
+    found: Dict[str, Any] = {}
+    current, builder = None, None
+    with open(file_path, "rb") as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if current is None:
+                if prefix == "" and event == "map_key" and value in wanted:
+                    current, builder = value, ijson.ObjectBuilder()
+                continue
+            builder.event(event, value)
+            if prefix == current and event in _SCALAR_EVENTS:
+                found[current] = builder.value
+                current = None
+                if len(found) == len(wanted):
+                    break
+    return found
+
+class LazyJSON(Mapping):
+    """Read-only mapping over some top-level keys of a JSON file, parsed in one pass on first access."""
+
+    def __init__(self, file_path: str, keys: Iterable[str]):
+        self.file_path = file_path
+        self.keys_ = tuple(keys)
+        self._data: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = read_json_keys(self.file_path, self.keys_)
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.keys_:
+            raise KeyError(f"{key} was not requested from {self.file_path}, requested keys: {self.keys_}")
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+def read_json(file_path: str, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
     """Read a JSON file and return its contents as a dictionary.
 
     Args:
         file_path (str): Path to the JSON file.
+        keys (Optional[Iterable[str]]): Only parse these top-level keys, returned as a lazy mapping.
 
     Returns:
         Dict[str, Any]: The contents of the JSON file as a dictionary.
     """
+    if keys is not None:
+        return LazyJSON(file_path, keys)
     with open(file_path, encoding="utf8") as f:
         return json.load(f)
 
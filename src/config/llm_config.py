@@ -27,6 +27,7 @@ class llm_config:
             print('Loading config from default: config/files/prompt_config.yml')
         self.condense_question_prompt = self.prompt_config['prompt']['condense_question_prompt']
         self.combine_docs_prompt = self.prompt_config['prompt']['combine_docs_prompt']
+        self.multi_question_qa_prompt = self.prompt_config['prompt'].get('multi_question_qa_prompt')
         # self.mode = model_config['ask']['client']
         self.model_config = model_config
         
@@ -61,7 +62,8 @@ class llm_config:
         # self.config["memory_configure"] = {
         #     "memory_core": ConversationBufferMemory}
         self.config["combine_docs_configure"] = {"llm_core": CHAT_MODELS_COMBINE, 
-                                                 "llm_core_params": LLL_PARAMS_COMBINE, "prompt_core_template": self.combine_docs_prompt}
+                                                 "llm_core_params": LLL_PARAMS_COMBINE, "prompt_core_template": self.combine_docs_prompt,
+                                                 "multi_question_template": self.multi_question_qa_prompt}
         if use_redis:
             self.config["stack_chain"] = {"runnable_chain": RunnableWithMessageHistory}
         else:
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.driver import redisdb
+
+DEFAULT_CACHE_PATH = "cache/llm_response_cache.sqlite"
+DEFAULT_EMBEDDING_CACHE_PATH = "cache/embedding_cache.sqlite"
+DEFAULT_DIGEST_CACHE_PATH = "cache/digest_cache.sqlite"
+
+
+def llm_fingerprint(llm) -> str:
+    """
+    Identify a chat model by its class, model name and sampling parameters.
+    Bound kwargs (llm.bind(...)) are unwrapped and included, the outermost binding wins.
+    """
+    bound_kwargs: Dict[str, Any] = {}
+    while hasattr(llm, "bound"):
+        for key, value in (getattr(llm, "kwargs", None) or {}).items():
+            bound_kwargs.setdefault(key, value)
+        llm = llm.bound
+    if hasattr(llm, "_get_llm_string"):
+        base = llm._get_llm_string()
+    else:
+        base = repr(llm)
+    return json.dumps({"llm": base, "kwargs": bound_kwargs}, sort_keys=True, default=str)
+
+def make_cache_key(prompt_text: str, llm) -> str:
+    """Content address of one llm call: hash of the rendered prompt, the model and its parameters."""
+    payload = json.dumps({"prompt": prompt_text, "llm": llm_fingerprint(llm)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def embedding_model_name(embedding) -> str:
+    """Identify an embedding model by its class, model name and output dimensions."""
+    model = getattr(embedding, "model", None) or getattr(embedding, "model_name", None)
+    dimensions = getattr(embedding, "dimensions", None)
+    return f"{type(embedding).__name__}:{model}:{dimensions}"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class SQLiteResponseCache:
+    """
+    Persistent llm response cache on local disk.
+    Arg:
+    - path: sqlite file
+    - ttl: seconds before an entry expires (None means never)
+    - max_entries: least recently used entries are evicted above this size (None means unbounded)
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = 100000,
+    ) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__conn:
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.__conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self.__lock, self.__conn:
+            row = self.__conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self.__conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.__conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self.__lock, self.__conn:
+            self.__conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now, now),
+            )
+            if self.max_entries is not None:
+                self.__conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self.__lock, self.__conn:
+            self.__conn.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        self.__conn.close()
+
+
+class RedisResponseCache:
+    """
+    llm response cache shared through the Redis of redisdb.RedisDB.
+    TTL is handled by Redis, the LRU order is kept in a sorted set to bound the number of entries.
+    """
+
+    def __init__(
+        self,
+        redis_db: Optional[redisdb.RedisDB] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = 100000,
+        key_prefix: str = "llm_response_cache:",
+        db: int = 0,
+    ) -> None:
+        redis_db = redis_db or redisdb.RedisDB()
+        if not redis_db.is_connected():
+            raise Exception("RedisResponseCache:\tRedis is not connected.")
+        self.__client = redis_db.get_client(db=db)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self.__lru_key = f"{key_prefix}__lru__"
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.__client.get(self.key_prefix + key)
+        if value is None:
+            # Expired entries also leave the LRU index
+            self.__client.zrem(self.__lru_key, key)
+            self.misses += 1
+            return None
+        self.__client.zadd(self.__lru_key, {key: time.time()})
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ex = int(self.ttl) if self.ttl is not None else None
+        pipe = self.__client.pipeline()
+        pipe.set(self.key_prefix + key, json.dumps(value, default=str), ex=ex)
+        pipe.zadd(self.__lru_key, {key: time.time()})
+        pipe.execute()
+        if self.max_entries is not None:
+            excess = self.__client.zcard(self.__lru_key) - self.max_entries
+            if excess > 0:
+                oldest = [k.decode() if isinstance(k, bytes) else k
+                          for k in self.__client.zrange(self.__lru_key, 0, excess - 1)]
+                pipe = self.__client.pipeline()
+                pipe.delete(*[self.key_prefix + k for k in oldest])
+                pipe.zrem(self.__lru_key, *oldest)
+                pipe.execute()
+
+    def clear(self) -> None:
+        keys = [k.decode() if isinstance(k, bytes) else k for k in self.__client.zrange(self.__lru_key, 0, -1)]
+        if keys:
+            self.__client.delete(*[self.key_prefix + k for k in keys])
+        self.__client.delete(self.__lru_key)
+
+    def __len__(self) -> int:
+        return self.__client.zcard(self.__lru_key)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+
+class SQLiteEmbeddingStore:
+    """
+    Persistent embedding store on local disk, keyed by model name and text hash.
+    Vectors are stored as float32 blobs.
+    """
+
+    def __init__(self, path: str = DEFAULT_EMBEDDING_CACHE_PATH) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__conn:
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, hash))"
+            )
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        with self.__lock:
+            # Stay under the sqlite limit of bound parameters
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                rows = self.__conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def set_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        with self.__lock, self.__conn:
+            self.__conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()],
+            )
+
+    def clear(self, model: Optional[str] = None) -> None:
+        with self.__lock, self.__conn:
+            if model is None:
+                self.__conn.execute("DELETE FROM embeddings")
+            else:
+                self.__conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        self.__conn.close()
@@ -1,11 +1,17 @@
 
 import os
-from typing import Optional, Any, List, Dict
+import asyncio
+import heapq
+from typing import Optional, Any, List, Dict, Tuple
 
 import weaviate
+from weaviate.classes.query import MetadataQuery
+from langchain_core.documents import Document
 from langchain_weaviate.vectorstores import WeaviateVectorStore as WeaviateLC
 from contextlib import contextmanager
 
+from src.driver import weaviatepool
+
 
 WEAVIATE_APIKEY = "WEAVIATE_APIKEY"
 WEAVIATE_HOST = "WEAVIATE_HOST"
@@ -44,6 +50,8 @@ HYBRID_SEARCH_CORE: List[str] = [
 
 class WeaviateDB:
     __host: str = None
+    __pool: weaviatepool.WeaviateClientPool = None
+    __vectorstores: Dict[Tuple, WeaviateLC] = None
     __connect_type: str = None
     __connected: bool = False
     __hybrid_search: bool = False
@@ -289,15 +297,9 @@ class WeaviateDB:
                     print(f'ANONYMOUS cannot connect with additional_headers: {str(e)}')
             else:
                 try:
-                    self.__client = weaviate.connect_to_custom(
-                        http_host= os.environ.get(WEAVIATE_HOST), #"10.100.224.34",  # URL only, no http prefix
-                        http_port= os.environ.get(WEAVIATE_HOST_PORT), #"8080",
-                        http_secure=False ,   # Set to True if https
-                        grpc_host= os.environ.get(WEAVIATE_GPC_URL),#  "10.100.224.34",
-                        grpc_port= os.environ.get(WEAVIATE_GPC_URL_PORT),#"50051",      # Default is 50051, WCD uses 443
-                        grpc_secure=False,   # Edit as needed
-                        skip_init_checks=True,
-                    )
+                    # Same connection as src.config.db.get_client, shared with VectorDB through the pool
+                    self.__pool = weaviatepool.get_pool()
+                    self.__client = self.__pool.get_client()
                     self.__connected = True
                     self.__connect_type = "ANONYMOUS"
                     self.__hybrid_search = True
@@ -327,9 +329,31 @@ class WeaviateDB:
     #
 
     def get_client(self):
+        # One pooled client is pinned to this instance so its vectorstores are reused, it is only
+        # swapped once the pool dropped it (invalidate) or it failed the pool's health check
+        if self.__pool is not None and not self.__pool.is_valid(self.__client):
+            self.__client = self.__pool.get_client()
         return self.__client
     #
 
+    def __get_vectorstore(self, index_name: str, text_key: str, embedding: Optional[Any]) -> WeaviateLC:
+        # One WeaviateLC per collection, embedding and client: building it reads the collection schema
+        client = self.get_client()
+        key = (index_name, text_key, id(embedding), id(client))
+        if self.__vectorstores is None:
+            self.__vectorstores = {}
+        if key not in self.__vectorstores:
+            # A reconnected client makes the vectorstores of the old one useless
+            self.__vectorstores = {k: v for k, v in self.__vectorstores.items() if k[3] == id(client)}
+            self.__vectorstores[key] = WeaviateLC(
+                client=client,
+                index_name=index_name,
+                text_key=text_key,
+                embedding=embedding,
+                use_multi_tenancy=True,
+            )
+        return self.__vectorstores[key]
+
     def get_langchain_vectorstore(
             self,
             index_name: Optional[str] = None,
@@ -341,16 +365,15 @@ class WeaviateDB:
             k: int = 4,
     ) -> Optional[WeaviateLC]:
         try:
-            vectorstore = WeaviateLC(
-                client=self.__client,
+            vectorstore = self.__get_vectorstore(
                 index_name=index_name or self.__rag_index_name,
                 text_key=text_key or self.__rag_text_key,
                 embedding=embedding,
-                use_multi_tenancy=True,
             )
             if as_retriever:
                 # return vectorstore.as_retriever(search_kwargs={'tenant': ['tenant1', 'tenant2']})
                 return vectorstore.as_retriever(search_kwargs={'tenant': tentant_name, 'k': k, "return_uuids": True})
+            return vectorstore
 
         except Exception as e:
             print(str(e))
@@ -366,8 +389,132 @@ class WeaviateDB:
 
         if index_name is not None:
             db = WeaviateLC.from_documents(
-                documents, embedding, client=self.__client,  tenant=tenant_name, index_name=index_name)
+                documents, embedding, client=self.get_client(),  tenant=tenant_name, index_name=index_name)
         else:
             db = WeaviateLC.from_documents(
-                documents, embedding, client=self.__client,  tenant=tenant_name)
-        return db
\ No newline at end of file
+                documents, embedding, client=self.get_client(),  tenant=tenant_name)
+        return db
+
+
+class AsyncWeaviateDB:
+    """
+    Retrieval on the async weaviate client, many tenants (and queries) are searched concurrently.
+    Arg:
+    - index_name, text_key: multi-tenant collection written by WeaviateLC / VectorDB (RAG_INDEX_NAME, RAG_TEXT_KEY by default)
+    - embedding: langchain embeddings used to embed the queries
+    - max_concurrency: queries in flight at the same time
+    Use it as `async with AsyncWeaviateDB(...) as db:` or call connect() and close().
+    """
+
+    def __init__(
+            self,
+            index_name: Optional[str] = None,
+            text_key: Optional[str] = None,
+            embedding: Optional[Any] = None,
+            max_concurrency: int = 16,
+    ) -> None:
+        self.index_name = index_name or os.environ.get(RAG_INDEX_NAME) or DEFAULT_INDEX_NAME
+        self.text_key = text_key or os.environ.get("RAG_TEXT_KEY") or DEFAULT_TEXT_KEY
+        self.embedding = embedding
+        self.max_concurrency = max_concurrency
+        self.__client = None
+
+    async def connect(self) -> None:
+        # Same connection settings as WeaviateDB / src.config.db.get_client
+        self.__client = weaviate.use_async_with_custom(
+            http_host=os.environ.get(WEAVIATE_HOST),
+            http_port=os.environ.get(WEAVIATE_HOST_PORT),
+            http_secure=False,
+            grpc_host=os.environ.get(WEAVIATE_GPC_URL),
+            grpc_port=os.environ.get(WEAVIATE_GPC_URL_PORT),
+            grpc_secure=False,
+            skip_init_checks=True,
+        )
+        await self.__client.connect()
+
+    async def close(self) -> None:
+        if self.__client is not None:
+            await self.__client.close()
+            self.__client = None
+
+    async def __aenter__(self) -> "AsyncWeaviateDB":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def _to_document(self, tenant_name: str, ob) -> Document:
+        metadata = {k: v for k, v in ob.properties.items() if k != self.text_key}
+        metadata.update(uuid=str(ob.uuid), tenant=tenant_name)
+        return Document(page_content=ob.properties.get(self.text_key, ""), metadata=metadata)
+
+    async def search_tenant(
+            self,
+            tenant_name: str,
+            query_vector: List[float],
+            query: Optional[str] = None,
+            k: int = 4,
+            alpha: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Top-k of one tenant as (document, score), higher is better.
+        near_vector by default (score = 1 - distance), hybrid on query and query_vector when alpha is given.
+        """
+        collection = self.__client.collections.get(self.index_name).with_tenant(tenant_name)
+        if alpha is not None:
+            response = await collection.query.hybrid(
+                query=query, vector=query_vector, alpha=alpha, limit=k,
+                return_metadata=MetadataQuery(score=True),
+            )
+            return [(self._to_document(tenant_name, ob), ob.metadata.score) for ob in response.objects]
+        response = await collection.query.near_vector(
+            near_vector=query_vector, limit=k, return_metadata=MetadataQuery(distance=True),
+        )
+        return [(self._to_document(tenant_name, ob), 1 - ob.metadata.distance) for ob in response.objects]
+
+    async def search_many(
+            self,
+            queries: List[str],
+            tenant_names: List[str],
+            k: int = 4,
+            alpha: Optional[float] = None,
+            merge: bool = False,
+            vectors: Optional[List[List[float]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Search every query in every tenant concurrently, the queries are embedded once
+        (not at all when their vectors are given, e.g. src.utils.question_sets.question_set_vectors).
+        Returns {query: {tenant: [(document, score), ...]}}, or with merge=True
+        {query: [(document, score), ...]} the top-k over all tenants.
+        Hybrid scores are normalized per tenant, merging them across tenants is only a rough ranking.
+        """
+        if vectors is None:
+            vectors = await self.embedding.aembed_documents(queries)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def search(query, vector, tenant_name):
+            async with semaphore:
+                return await self.search_tenant(tenant_name, vector, query=query, k=k, alpha=alpha)
+
+        pairs = [(query, vector, tenant_name) for query, vector in zip(queries, vectors) for tenant_name in tenant_names]
+        results = await asyncio.gather(*(search(*pair) for pair in pairs))
+        by_query: Dict[str, Dict[str, List[Tuple[Document, float]]]] = {query: {} for query in queries}
+        for (query, _, tenant_name), hits in zip(pairs, results):
+            by_query[query][tenant_name] = hits
+        if not merge:
+            return by_query
+        return {
+            query: heapq.nlargest(k, (hit for hits in tenants.values() for hit in hits), key=lambda hit: hit[1])
+            for query, tenants in by_query.items()
+        }
+
+    async def search_tenants(
+            self,
+            query: str,
+            tenant_names: List[str],
+            k: int = 4,
+            alpha: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Top-k of one query over many tenants."""
+        return (await self.search_many([query], tenant_names, k=k, alpha=alpha, merge=True))[query]
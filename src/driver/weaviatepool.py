@@ -0,0 +1,131 @@
+import atexit
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from weaviate.exceptions import WeaviateClosedClientError, WeaviateConnectionError, WeaviateTimeoutError
+
+import src.config.db as config_db
+
+# Errors after which a client is dropped and a new one is connected on the next use
+CONNECTION_ERRORS = (WeaviateClosedClientError, WeaviateConnectionError, WeaviateTimeoutError)
+
+
+class WeaviateClientPool:
+    """
+    Long-lived weaviate clients shared by every thread (the v4 client is thread-safe).
+    Clients are connected on first use and handed out round-robin. A client not checked for more than
+    health_check_interval seconds is checked with is_live() before it is handed out, a dead one is replaced.
+    Arg:
+    - factory: builds a connected client, e.g. src.config.db.get_client
+    - size: number of clients (and gRPC channels)
+    - health_check_interval: seconds between two health checks of a client
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int = 2,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        self.factory = factory
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.__clients: List[Optional[Any]] = [None] * size
+        self.__checked_at: List[float] = [0.0] * size
+        self.__locks = [threading.Lock() for _ in range(size)]
+        self.__next = itertools.count()
+
+    @staticmethod
+    def _is_healthy(client) -> bool:
+        try:
+            return client.is_live()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(client) -> None:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def __checked_client(self, slot: int, now: float) -> Optional[Any]:
+        # Slot lock held: the client of the slot, None when there is none or it is not live anymore
+        client = self.__clients[slot]
+        if client is not None and now - self.__checked_at[slot] > self.health_check_interval:
+            if self._is_healthy(client):
+                self.__checked_at[slot] = now
+            else:
+                print("WeaviateClientPool:\tclient is not live, reconnecting")
+                self._close(client)
+                self.__clients[slot] = None
+                client = None
+        return client
+
+    def get_client(self):
+        slot = next(self.__next) % self.size
+        with self.__locks[slot]:
+            now = time.monotonic()
+            client = self.__checked_client(slot, now)
+            if client is None:
+                client = self.factory()
+                self.__clients[slot] = client
+                self.__checked_at[slot] = now
+            return client
+
+    def is_valid(self, client) -> bool:
+        """Whether a client handed out by get_client is still in the pool and live (same health check)."""
+        if client is None:
+            return False
+        for slot in range(self.size):
+            with self.__locks[slot]:
+                if self.__clients[slot] is client:
+                    return self.__checked_client(slot, time.monotonic()) is not None
+        return False
+
+    @contextmanager
+    def client(self):
+        """Borrow a client, it stays open afterwards. A connection error drops it from the pool."""
+        client = self.get_client()
+        try:
+            yield client
+        except CONNECTION_ERRORS:
+            self.invalidate(client)
+            raise
+
+    def invalidate(self, client) -> None:
+        for slot in range(self.size):
+            with self.__locks[slot]:
+                if self.__clients[slot] is client:
+                    self.__clients[slot] = None
+                    self._close(client)
+
+    def close(self) -> None:
+        for slot in range(self.size):
+            with self.__locks[slot]:
+                if self.__clients[slot] is not None:
+                    self._close(self.__clients[slot])
+                    self.__clients[slot] = None
+
+
+_pools: Dict[str, WeaviateClientPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name: str = "default", factory: Optional[Callable[[], Any]] = None, **kwargs) -> WeaviateClientPool:
+    """
+    Process-wide pool by name, built on first call.
+    The default factory is src.config.db.get_client (WEAVIATE_HOST, WEAVIATE_GPC_URL, ... env vars).
+    """
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = WeaviateClientPool(factory or config_db.get_client, **kwargs)
+        return _pools[name]
+
+@atexit.register
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
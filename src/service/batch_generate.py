@@ -0,0 +1,295 @@
+"""
+Run one Generation strategy over the whole corpus with bounded concurrency.
+
+Each meeting is written to <output-dir>/<file> as soon as it is generated and recorded
+in a checkpoint log, so an interrupted run picks up where it stopped.
+
+Example:
+    python -m src.service.batch_generate \
+        --strategy generate_category_rag_multi_input_agenda \
+        --qa-root DATA/qa_by_rag \
+        --output-dir output/generate_category_rag_multi_input_agenda \
+        --max-concurrency 8
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.tracers.context import tracing_v2_enabled
+
+from src.driver.cachedb import DEFAULT_DIGEST_CACHE_PATH, SQLiteResponseCache
+from src.utils import utils
+from src.utils.generate import Generation
+from src.utils.llm_models import get_llm_model
+
+CHECKPOINT_FILE = "_checkpoint.jsonl"
+
+
+def load_qa_text(file: str, root: str) -> str:
+    """Load the RAG question/answer pairs of one meeting as text."""
+    with open(f'{root}/{file}', 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    lines = [f'Question:{q}\nAnswer:{a}' for q, a in data['qa'].items()]
+    return '\n'.join(lines)
+
+# Input builders return the keyword arguments of the Generation method
+# and the fields saved next to the agenda (same fields as the notebooks)
+def _recap_inputs(file: str, args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    jsondict = utils.extract_data_from_file(file, root=args.data_root, keys=('transcript', 'summary'))
+    inputs = {'transcript': jsondict['transcript'], 'summary': jsondict['summary']}
+    return inputs, dict(inputs)
+
+def _truncated_inputs(file: str, args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    jsondict = utils.extract_data_from_file(file, root=args.data_root, keys=('shared-doc',))
+    truncate_shared_docs = utils.truncate_shared_docs(jsondict['shared-doc'], max_tokens=args.max_tokens)
+    return {'shared_docs': truncate_shared_docs}, {'truncate_shared_docs': truncate_shared_docs}
+
+def _category_truncated_inputs(file: str, args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    inputs, saved = _truncated_inputs(file, args)
+    category, description = utils.extract_category(file)
+    inputs.update(category=category, description=description)
+    saved.update(category=category, description=description)
+    return inputs, saved
+
+def _digest_inputs(file: str, args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Per-document shared docs only exist in the raw meetings
+    jsondict = utils.extract_data_from_file(file, root=args.raw_data_root, keys=('shared-doc',))
+    shared_docs = list(utils.iter_shared_docs(jsondict))
+    return {'shared_docs': shared_docs}, {'shared_docs': [doc['filename'] for doc in shared_docs]}
+
+def _rag_inputs(file: str, args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    qa_text = load_qa_text(file, args.qa_root)
+    return {'qa_text': qa_text}, {'qa_text': qa_text}
+
+def _category_rag_inputs(file: str, args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    inputs, saved = _rag_inputs(file, args)
+    category, description = utils.extract_category(file)
+    inputs.update(category=category, description=description)
+    saved.update(category=category, description=description)
+    return inputs, saved
+
+STRATEGIES: Dict[str, Callable] = {
+    'generate_recap_agenda': _recap_inputs,
+    'generate_truncated_sigle_input_agenda': _truncated_inputs,
+    'generate_truncated_multi_input_agenda': _truncated_inputs,
+    'generate_category_truncated_multi_input_agenda': _category_truncated_inputs,
+    'generate_digest_multi_input_agenda': _digest_inputs,
+    'generate_rag_multi_input_agenda': _rag_inputs,
+    'generate_category_rag_multi_input_agenda': _category_rag_inputs,
+}
+RAG_STRATEGIES = ('generate_rag_multi_input_agenda', 'generate_category_rag_multi_input_agenda')
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    message = str(e).lower()
+    return type(e).__name__ == "RateLimitError" or "429" in message or "rate limit" in message
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """Read the provider's retry-after header from an API error, if there is one."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class Checkpoint:
+    """Append-only log of processed meetings. A meeting is done once its output file exists."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.status: Dict[str, str] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a partial last line
+                        continue
+                    self.status[record['file']] = record['status']
+
+    def is_done(self, file: str) -> bool:
+        return self.status.get(file) == 'done' and os.path.exists(os.path.join(self.output_dir, file))
+
+    def record(self, file: str, status: str, error: str = '') -> None:
+        self.status[file] = status
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'file': file, 'status': status, 'error': error, 'time': time.time()}) + '\n')
+
+
+class BatchGenerator:
+    """
+    Dispatch one Generation strategy over many meetings.
+    Arg:
+    - generate: Generation instance
+    - llm: chat model shared by every call
+    - strategy: name of the Generation.generate_* method
+    - output_dir: folder of the per-meeting json outputs and the checkpoint
+    - max_concurrency: number of meetings generated at the same time
+    - max_attempts: attempts per meeting when the provider rate-limits us
+    - params: sampling params of every call (None means the Generation defaults)
+    """
+
+    def __init__(
+        self,
+        generate: Generation,
+        llm,
+        strategy: str,
+        output_dir: str,
+        max_concurrency: int = 4,
+        max_attempts: int = 6,
+        base_delay: float = 2.0,
+        params: Optional[Dict[str, Any]] = None,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Strategy must be one of {list(STRATEGIES)}, got {strategy}")
+        self.generate = generate
+        self.llm = llm
+        self.strategy = strategy
+        self.output_dir = output_dir
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.params = params if params is not None else {}
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(output_dir)
+        # Shared cool-down: once one call is rate-limited, every worker waits until this time
+        self._resume_at = 0.0
+
+    async def _wait_for_cooldown(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _generate(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        method = getattr(self.generate, self.strategy)
+        for attempt in range(self.max_attempts):
+            await self._wait_for_cooldown()
+            try:
+                return await asyncio.to_thread(method, llm=self.llm, params=self.params, **inputs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_attempts - 1:
+                    raise
+                delay = retry_after_seconds(e) or self.base_delay * 2 ** attempt + random.random()
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                print(f"Rate limit hit, backing off for {delay:.1f} seconds")
+
+    def _write_output(self, file: str, data: Dict[str, Any]) -> None:
+        # Write then rename, a crash never leaves a half-written output behind
+        path = os.path.join(self.output_dir, file)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+
+    async def _run_one(self, file: str, build_inputs: Callable, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                inputs, saved = await asyncio.to_thread(build_inputs, file)
+                agenda = await self._generate(inputs)
+                self._write_output(file, {**saved, 'agenda': agenda['text']})
+                self.checkpoint.record(file, 'done')
+                print(f"Finish {file}")
+            except Exception as e:
+                self.checkpoint.record(file, 'failed', str(e))
+                print(f"Failed {file}: {e}")
+
+    async def run(self, files: List[str], build_inputs: Callable[[str], Tuple[Dict, Dict]]) -> Dict[str, str]:
+        todo = [file for file in files if not self.checkpoint.is_done(file)]
+        print(f"{self.strategy}: {len(files) - len(todo)} meetings already done, {len(todo)} to generate")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        await asyncio.gather(*(self._run_one(file, build_inputs, semaphore) for file in todo))
+        return {file: self.checkpoint.status.get(file, '') for file in files}
+
+
+def list_meetings(args) -> List[str]:
+    if args.strategy in RAG_STRATEGIES:
+        files = sorted(os.listdir(args.qa_root))
+    else:
+        files = list(utils.load_data_with_shared_doc_path(args.meetings_csv)['file'].values)
+    return files[:args.limit] if args.limit else files
+
+def main(args) -> None:
+    load_dotenv()
+    file_config = utils.load_config("src/config/file_config.yml")
+    prompt_config = utils.load_config(file_config["llm_env"]["prompting_file"])
+    cache = SQLiteResponseCache(args.cache_path) if args.cache_path else None
+    # Digests of the shared documents are cached by default, they are the same from one run to the next
+    digest_cache = None
+    if args.strategy == 'generate_digest_multi_input_agenda' and args.digest_cache_path:
+        digest_cache = SQLiteResponseCache(args.digest_cache_path)
+    generate = Generation(prompt_config, cache=cache, digest_cache=digest_cache)
+    llm = get_llm_model(
+        chatmodel=args.llm_choice,
+        model_name=args.model_choice,
+        param={'max_retries': args.max_retries},
+    )
+    # Sampling params are bound per call by Generation
+    params = {'temperature': args.temperature, 'top_p': args.top_p}
+    if args.max_output_tokens:
+        params['max_tokens'] = args.max_output_tokens
+    runner = BatchGenerator(
+        generate=generate,
+        llm=llm,
+        strategy=args.strategy,
+        output_dir=args.output_dir,
+        max_concurrency=args.max_concurrency,
+        params=params,
+    )
+    build_inputs = STRATEGIES[args.strategy]
+    tracing = tracing_v2_enabled(project_name=args.strategy) if args.trace else contextlib.nullcontext()
+    with tracing:
+        status = asyncio.run(runner.run(list_meetings(args), lambda file: build_inputs(file, args)))
+    failed = [file for file, s in status.items() if s != 'done']
+    print(f"Done: {len(status) - len(failed)}/{len(status)}, failed: {failed}")
+    if cache is not None:
+        print(f"Response cache: {cache.stats()}")
+    if digest_cache is not None:
+        print(f"Digest cache: {digest_cache.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate agendas for every meeting with one Generation strategy")
+    parser.add_argument('--strategy', type=str, required=True, choices=list(STRATEGIES),
+                        help='Generation method to run')
+    parser.add_argument('--output-dir', type=str, required=True,
+                        help='Folder of the generated agendas, also holds the checkpoint')
+    parser.add_argument('--data-root', type=str, default='DATA/AMI_MS_Cleaned',
+                        help='Folder of the cleaned meeting json files')
+    parser.add_argument('--raw-data-root', type=str, default='DATA/AMI_MS',
+                        help='Folder of the raw meeting json files (digest strategy only)')
+    parser.add_argument('--qa-root', type=str, default='DATA/qa_by_rag',
+                        help='Folder of the qa_by_rag json files (RAG strategies only)')
+    parser.add_argument('--meetings-csv', type=str, default='EDA/token_data.csv',
+                        help='Token statistics, meetings with shared documents are generated')
+    parser.add_argument('--max-tokens', type=int, default=90000,
+                        help='Token budget of the truncated shared documents')
+    parser.add_argument('--max-concurrency', type=int, default=4,
+                        help='Number of meetings generated at the same time')
+    parser.add_argument('--limit', type=int, default=0,
+                        help='Only generate the first N meetings (0 means all)')
+    parser.add_argument('--llm-choice', type=str, default='OpenAI', choices=['OpenAI', 'Ollama'])
+    parser.add_argument('--model-choice', type=str, default='gpt-4o-mini')
+    parser.add_argument('--temperature', type=float, default=0.2)
+    parser.add_argument('--top-p', type=float, default=0.95)
+    parser.add_argument('--max-output-tokens', type=int, default=0,
+                        help='Cap on the generated agenda length in tokens (0 means no cap)')
+    parser.add_argument('--max-retries', type=int, default=2)
+    parser.add_argument('--cache-path', type=str, default='',
+                        help='SQLite file of the llm response cache, identical prompts are not sent twice')
+    parser.add_argument('--digest-cache-path', type=str, default=DEFAULT_DIGEST_CACHE_PATH,
+                        help='SQLite file of the shared document digests (digest strategy only, empty to disable)')
+    parser.add_argument('--trace', action='store_true',
+                        help='Trace the runs to LangSmith under the strategy name')
+    main(parser.parse_args())
@@ -1,46 +1,267 @@
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from uuid import UUID, uuid4
+
 from langchain.prompts import PromptTemplate
-from langchain import callbacks
 
-class Simple_Assistance:
+from src.driver.cachedb import make_cache_key
+
+# Top-level agenda item: "1. Intro", "**1. Intro**", "### 1. Intro", at most one space of indentation
+AGENDA_ITEM_PATTERN = re.compile(r"^ ?(?:#+\s*)?(?:\*\*)?\d+\.\s")
+# Lines that continue the current item: blank, indented or a bullet
+AGENDA_CONTINUATION_PATTERN = re.compile(r"^(?:\s|$|[+\-•]\s|\*\s)")
+
+class AgendaItemStream:
     """
-    From the defined template and input content to generate text
+    Collect streamed tokens and call on_item(text) as soon as a top-level agenda item is complete,
+    i.e. when the next item starts, a non-item line follows or the stream ends.
+    """
+
+    def __init__(self, on_item: Optional[Callable[[str], None]] = None):
+        self.on_item = on_item
+        self._line = ""
+        self._item: Optional[List[str]] = None
+
+    def feed(self, token: str) -> None:
+        self._line += token
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            self._add_line(line)
+        # The next item is starting, no need to wait for the end of its first line
+        if self._item is not None and AGENDA_ITEM_PATTERN.match(self._line):
+            self._flush()
+
+    def close(self) -> None:
+        if self._line:
+            self._add_line(self._line)
+            self._line = ""
+        self._flush()
+
+    def _add_line(self, line: str) -> None:
+        if AGENDA_ITEM_PATTERN.match(line):
+            self._flush()
+            self._item = [line]
+        elif self._item is not None:
+            if AGENDA_CONTINUATION_PATTERN.match(line):
+                self._item.append(line)
+            else:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._item is not None:
+            text = "\n".join(self._item).rstrip()
+            self._item = None
+            if self.on_item is not None:
+                self.on_item(text)
+
+class Base_Assistance:
+    """
+    Call paths shared by the assistants around the `prompt | llm` chain.
+    Every call returns {"text": ..., "__run": {"run_id": ...}}, one per item for the batch calls.
     Arg:
     - template: prompt confige
-    - content: text input
+    - llm: chat model
+    - inputs: prompt variables of the default call
+    - max_concurrency: maximum number of parallel llm calls in batch/abatch (None means no limit)
+    - cache: optional response cache (src.driver.cachedb), keyed by the rendered prompt, model and parameters
     """
 
     def __init__(
         self,
         template,
-        content,
         llm,
+        inputs: Dict[str, Any],
+        max_concurrency: Optional[int] = None,
+        cache=None,
     ):
-        prompt = PromptTemplate.from_template(
+        self.prompt = PromptTemplate.from_template(
             template
         )
-        prompt.format(
-            content=content,
-        )
-        self.llm_chain = prompt | llm
-        self.content =  content
-        
-    def __call__(self):        
-        with callbacks.collect_runs() as cb:
-            result = self.llm_chain.invoke(
-                {
-                    "content": self.content,
-                },
-            )
-            run_id= cb.traced_runs[0].id
-        response = {
-                "text": result.content,
+        self.llm = llm
+        self.llm_chain = self.prompt | llm
+        self.inputs = inputs
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.last_response = None
+
+    @staticmethod
+    def _response(result, run_id):
+        return Base_Assistance._text_response(result.content, run_id)
+
+    @staticmethod
+    def _text_response(text: str, run_id):
+        return {
+                "text": text,
                 "__run":{
                     "run_id": run_id
                 }
             }
+
+    def _cache_key(self, inputs: Dict[str, Any]) -> str:
+        return make_cache_key(self.prompt.format(**inputs), self.llm)
+
+    def _cache_get(self, inputs: Dict[str, Any]):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._cache_key(inputs))
+        if cached is None:
+            return None
+        return {
+                "text": cached["text"],
+                "__run":{
+                    "run_id": UUID(cached["run_id"]),
+                    "cached": True,
+                }
+            }
+
+    def _cache_set(self, inputs: Dict[str, Any], response) -> None:
+        if self.cache is not None and not isinstance(response, Exception):
+            self.cache.set(
+                self._cache_key(inputs),
+                {"text": response["text"], "run_id": str(response["__run"]["run_id"])},
+            )
+
+    def _batch_configs(self, size: int, max_concurrency: Optional[int]) -> List[Dict[str, Any]]:
+        # A run ID per item, so each response can still be traced back to its run
+        max_concurrency = max_concurrency or self.max_concurrency
+        return [{"run_id": uuid4(), "max_concurrency": max_concurrency} for _ in range(size)]
+
+    def __call__(self):
+        cached = self._cache_get(self.inputs)
+        if cached is not None:
+            return cached
+        run_id = uuid4()
+        result = self.llm_chain.invoke(self.inputs, config={"run_id": run_id})
+        response = self._response(result, run_id)
+        self._cache_set(self.inputs, response)
         return response
 
-class Two_Input_Assistance:
+    async def acall(self):
+        cached = self._cache_get(self.inputs)
+        if cached is not None:
+            return cached
+        run_id = uuid4()
+        result = await self.llm_chain.ainvoke(self.inputs, config={"run_id": run_id})
+        response = self._response(result, run_id)
+        self._cache_set(self.inputs, response)
+        return response
+
+    def stream(self, on_item: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+        """
+        Yield the completion token by token.
+        on_item is called with the text of each top-level agenda item as soon as it is complete.
+        The full response is kept in self.last_response once the stream is exhausted.
+        """
+        items = AgendaItemStream(on_item)
+        cached = self._cache_get(self.inputs)
+        if cached is not None:
+            items.feed(cached["text"])
+            items.close()
+            self.last_response = cached
+            yield cached["text"]
+            return
+        run_id = uuid4()
+        tokens = []
+        for chunk in self.llm_chain.stream(self.inputs, config={"run_id": run_id}):
+            if not chunk.content:
+                continue
+            tokens.append(chunk.content)
+            items.feed(chunk.content)
+            yield chunk.content
+        items.close()
+        self.last_response = self._text_response("".join(tokens), run_id)
+        self._cache_set(self.inputs, self.last_response)
+
+    async def astream(self, on_item: Optional[Callable[[str], None]] = None) -> AsyncIterator[str]:
+        """Async version of stream."""
+        items = AgendaItemStream(on_item)
+        cached = self._cache_get(self.inputs)
+        if cached is not None:
+            items.feed(cached["text"])
+            items.close()
+            self.last_response = cached
+            yield cached["text"]
+            return
+        run_id = uuid4()
+        tokens = []
+        async for chunk in self.llm_chain.astream(self.inputs, config={"run_id": run_id}):
+            if not chunk.content:
+                continue
+            tokens.append(chunk.content)
+            items.feed(chunk.content)
+            yield chunk.content
+        items.close()
+        self.last_response = self._text_response("".join(tokens), run_id)
+        self._cache_set(self.inputs, self.last_response)
+
+    def batch(
+        self,
+        inputs_list: Optional[List[Dict[str, Any]]] = None,
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+    ):
+        """
+        Generate for many inputs in one call.
+        inputs_list holds dicts of prompt variables, e.g. [{"content": ...}, ...], defaults to the instance inputs.
+        With return_exceptions=True a failed item is returned as its exception instead of failing the whole batch.
+        An empty inputs_list returns [] without calling the llm.
+        """
+        if inputs_list is None:
+            inputs_list = [self.inputs]
+        responses = [self._cache_get(inputs) for inputs in inputs_list]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            configs = self._batch_configs(len(missing), max_concurrency)
+            results = self.llm_chain.batch(
+                [inputs_list[i] for i in missing], config=configs, return_exceptions=return_exceptions
+            )
+            self._fill_batch(inputs_list, responses, missing, results, configs)
+        return responses
+
+    async def abatch(
+        self,
+        inputs_list: Optional[List[Dict[str, Any]]] = None,
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+    ):
+        """Async version of batch."""
+        if inputs_list is None:
+            inputs_list = [self.inputs]
+        responses = [self._cache_get(inputs) for inputs in inputs_list]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            configs = self._batch_configs(len(missing), max_concurrency)
+            results = await self.llm_chain.abatch(
+                [inputs_list[i] for i in missing], config=configs, return_exceptions=return_exceptions
+            )
+            self._fill_batch(inputs_list, responses, missing, results, configs)
+        return responses
+
+    def _fill_batch(self, inputs_list, responses, missing, results, configs) -> None:
+        for i, result, config in zip(missing, results, configs):
+            responses[i] = result if isinstance(result, Exception) else self._response(result, config["run_id"])
+            self._cache_set(inputs_list[i], responses[i])
+
+class Simple_Assistance(Base_Assistance):
+    """
+    From the defined template and input content to generate text
+    Arg:
+    - template: prompt confige
+    - content: text input
+    """
+
+    def __init__(
+        self,
+        template,
+        content,
+        llm,
+        max_concurrency: Optional[int] = None,
+        cache=None,
+    ):
+        super().__init__(template, llm, {"content": content}, max_concurrency, cache)
+        self.content =  content
+
+class Two_Input_Assistance(Base_Assistance):
     """
     From the defined template and input content to generate text
     Arg:
@@ -55,36 +276,14 @@ class Two_Input_Assistance:
         input1,
         input2,
         llm,
+        max_concurrency: Optional[int] = None,
+        cache=None,
     ):
-        prompt = PromptTemplate.from_template(
-            template
-        )
-        prompt.format(
-            input1=input1,
-            input2=input1,
-        )
-        self.llm_chain = prompt | llm
+        super().__init__(template, llm, {"input1": input1, "input2": input2}, max_concurrency, cache)
         self.input1 =  input1
         self.input2 = input2
-        
-    def __call__(self):        
-        with callbacks.collect_runs() as cb:
-            result = self.llm_chain.invoke(
-                {
-                    "input1": self.input1,
-                    "input2": self.input2,
-                },
-            )
-            run_id= cb.traced_runs[0].id
-        response = {
-                "text": result.content,
-                "__run":{
-                    "run_id": run_id
-                }
-            }
-        return response
 
-class Triple_Input_Assistance:
+class Triple_Input_Assistance(Base_Assistance):
     """
     From the defined template and input content to generate text
     Arg:
@@ -101,35 +300,10 @@ class Triple_Input_Assistance:
         input2,
         input3,
         llm,
+        max_concurrency: Optional[int] = None,
+        cache=None,
     ):
-        prompt = PromptTemplate.from_template(
-            template
-        )
-        prompt.format(
-            input1=input1,
-            input2=input1,
-            input3=input3,
-        )
-        self.llm_chain = prompt | llm
+        super().__init__(template, llm, {"input1": input1, "input2": input2, "input3": input3}, max_concurrency, cache)
         self.input1 =  input1
         self.input2 = input2
         self.input3 = input3
-
-    def __call__(self):        
-        with callbacks.collect_runs() as cb:
-            result = self.llm_chain.invoke(
-                {
-                    "input1": self.input1,
-                    "input2": self.input2,
-                    "input3": self.input3,
-                },
-            )
-            run_id= cb.traced_runs[0].id
-        response = {
-                "text": result.content,
-                "__run":{
-                    "run_id": run_id
-                }
-            }
-        return response
-    
\ No newline at end of file
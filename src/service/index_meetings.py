@@ -0,0 +1,76 @@
+"""
+Index the shared documents of every meeting into the RAG collection, one tenant per meeting.
+
+Each meeting is synced against the index manifest (VectorDB.sync_meeting_to_db): only new chunks are
+embedded and pushed with the batched import (bulk_import_to_db), removed chunks are deleted, so a rerun
+after a data change only touches what changed. The meeting -> tenant table read by the RAG notebooks
+is written at the end.
+
+Example:
+    python -m src.service.index_meetings \
+        --data-root DATA/AMI_MS \
+        --index-name LangChain_agd_7bb158e64c93bea491df09894psd
+"""
+import argparse
+import os
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from src.utils import utils
+from src.utils.embedding import VectorDB
+from src.utils.index_manifest import DEFAULT_MANIFEST_PATH, DEFAULT_TENANT_CSV_PATH, IndexManifest
+
+
+def meeting_sources(file: str, data_root: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """{filename: content} and {filename: txt/doc/ppt} of the shared documents of one meeting."""
+    jsondict = utils.extract_data_from_file(file, root=data_root, keys=('shared-doc',))
+    if not jsondict.get('shared-doc'):
+        return {}, {}
+    sources, source_types = {}, {}
+    for doc in utils.iter_shared_docs(jsondict):
+        sources[doc['filename']] = utils.clean_text(doc['content'])
+        source_types[doc['filename']] = doc['type']
+    return sources, source_types
+
+def list_meetings(args) -> List[str]:
+    files = list(utils.load_data_with_shared_doc_path(args.meetings_csv)['file'].values)
+    return files[:args.limit] if args.limit else files
+
+def main(args) -> None:
+    load_dotenv()
+    file_config = utils.load_config("src/config/file_config.yml")
+    model_config = utils.load_config(file_config["llm_env"]["model_config_file"])
+    vectordb = VectorDB(model_config)
+    index_name = args.index_name or os.environ.get("COLLECTION_ID")
+    manifest = IndexManifest(args.manifest)
+    failed = []
+    for file in list_meetings(args):
+        try:
+            sources, source_types = meeting_sources(file, args.data_root)
+            stats = vectordb.sync_meeting_to_db(
+                file, sources, manifest, index_name=index_name, source_types=source_types,
+            )
+            print(f"{file}: {stats['inserted']} inserted, {stats['deleted']} deleted, "
+                  f"{stats['unchanged']} unchanged, {len(stats['errors'])} errors")
+        except Exception as e:
+            failed.append(file)
+            print(f"Failed {file}: {e}")
+    manifest.to_tenant_csv(args.tenant_csv)
+    print(f"Done, failed: {failed}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the shared documents of every meeting into the RAG collection")
+    parser.add_argument('--data-root', type=str, default='DATA/AMI_MS',
+                        help='Folder of the meeting json files (raw files keep the ppt slide boundaries)')
+    parser.add_argument('--meetings-csv', type=str, default='EDA/token_data.csv',
+                        help='Token statistics, meetings with shared documents are indexed')
+    parser.add_argument('--index-name', type=str, default='',
+                        help='Weaviate collection (default: COLLECTION_ID env var)')
+    parser.add_argument('--manifest', type=str, default=DEFAULT_MANIFEST_PATH,
+                        help='Index manifest of the chunks already in the collection')
+    parser.add_argument('--tenant-csv', type=str, default=DEFAULT_TENANT_CSV_PATH,
+                        help='Meeting -> tenant table written at the end')
+    parser.add_argument('--limit', type=int, default=0,
+                        help='Only index the first N meetings (0 means all)')
+    main(parser.parse_args())
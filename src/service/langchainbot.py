@@ -1,4 +1,5 @@
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 from itertools import groupby
 from langchain.output_parsers import ResponseSchema, StructuredOutputParser
@@ -35,13 +36,27 @@ from langchain_openai import OpenAI
 # Additional imports for database drivers and system instructions
 from src.driver import redisdb, weaviatedb
 import src.utils.utils as utils
+from src.utils import question_sets
 from uuid import uuid4
 from langchain_core.tracers.context import collect_runs
+from langchain_core.documents import Document
+from langchain_core.output_parsers import JsonOutputParser
 
 # from llm.conversationchain import ConversationChain, ConversationalRetrievalChain
 # from embedding.systeminstruct import SystemInstruct
 # mapping title with gglink
-    
+
+def _unique_documents(docs_per_question: List[List[Document]]) -> List[Document]:
+    """Chunks retrieved for several questions, each chunk once (by uuid), in retrieval order."""
+    seen, documents = set(), []
+    for docs in docs_per_question:
+        for doc in docs:
+            key = doc.metadata.get("uuid") or doc.page_content
+            if key not in seen:
+                seen.add(key)
+                documents.append(doc)
+    return documents
+
 class LangChainBot:
     __history_configure = False
     __knowledge_configure = False
@@ -232,6 +247,9 @@ class LangChainBot:
         )
         '''
         try:            
+            self.__tenant_name = tenant_name
+            self.__index_db = index_db
+            self.__text_key = text_key
             llm = llm_core(**llm_core_params)
             retriever = self.__retriever.get_langchain_vectorstore(as_retriever=True,
                                                                 tentant_name=tenant_name,
@@ -265,6 +283,7 @@ class LangChainBot:
             prompt_core_template,
             llm_core,
             llm_core_params: Dict[str, Any] = {},
+            multi_question_template: Optional[str] = None,
     ) -> bool:
         '''
         The default prompt is 
@@ -306,11 +325,28 @@ class LangChainBot:
                 document_variable_name = "context",
                 )
             self.__combine_docs_configure = question_answer_chain
+            # Several questions answered from one context in one call, see ask_many(mode="single")
+            self.__multi_question_chain = None
+            if multi_question_template:
+                multi_question_prompt = ChatPromptTemplate.from_messages(
+                    [
+                        ("system", multi_question_template),
+                        ("human", "{input}"),
+                    ]
+                )
+                self.__multi_question_chain = create_stuff_documents_chain(
+                    llm=llm,
+                    prompt=multi_question_prompt,
+                    document_prompt=customDocumentPrompt,
+                    document_variable_name="context",
+                    output_parser=JsonOutputParser(),
+                )
             return True 
         
         except Exception as e:
             print(str(e))
             self.__combine_docs_configure = None
+            self.__multi_question_chain = None
             return False
 
     def memory_configure(
@@ -470,6 +506,109 @@ class LangChainBot:
             traceback.print_exc()
             # return {"bot" : "this is a sample response for debugger"}, ""
             return "_", e
+
+    def retrieve_many(
+            self,
+            questions: List[str],
+            tenant_name: Optional[str] = None,
+            k: int = 10,
+            max_workers: int = 8,
+            question_vectors: Optional[List[List[float]]] = None,
+    ) -> List[List[Document]]:
+        '''
+        Context of each question in one tenant (the configured one by default).
+        Without question_vectors the questions are embedded in one call (embed_documents),
+        the searches run in parallel. Raises when the vectorstore of the index cannot be built.
+        '''
+        vectorstore = self.__retriever.get_langchain_vectorstore(
+            as_retriever=False,
+            index_name=self.__index_db,
+            text_key=self.__text_key,
+            embedding=self.__llm_embedding,
+        )
+        tenant_name = tenant_name or self.__tenant_name
+        if vectorstore is None:
+            raise Exception(
+                f"LangChainBot:\tNo vectorstore for index {self.__index_db} (tenant {tenant_name}), "
+                "is the vector database connected?")
+        vectors = question_vectors or self.__llm_embedding.embed_documents(questions)
+        with ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(
+                lambda question, vector: vectorstore.similarity_search(
+                    query=question, vector=vector, k=k, tenant=tenant_name, return_uuids=True),
+                questions,
+                vectors,
+            ))
+
+    def ask_many(
+            self,
+            questions: List[str],
+            tenant_name: Optional[str] = None,
+            k: int = 10,
+            mode: str = "batch",
+            max_concurrency: int = 8,
+            question_vectors: Optional[List[List[float]]] = None,
+    ) -> Dict[str, str]:
+        '''
+        Answer several questions about one tenant, without chat history. Returns {question: answer}.
+        mode:
+        - "batch": one answer chain per question with its own context, the calls run concurrently
+        - "single": one call answering every question from the union of the retrieved chunks (each chunk
+          once), needs multi_question_template; the questions missing from its JSON reply fall back to "batch"
+        '''
+        docs_per_question = self.retrieve_many(
+            questions, tenant_name=tenant_name, k=k, max_workers=max_concurrency, question_vectors=question_vectors)
+        answers: Dict[str, str] = {}
+        if mode == "single":
+            if self.__multi_question_chain is None:
+                raise ValueError("mode='single' needs combine_docs_configure(multi_question_template=...)")
+            numbered = "\n".join(f"{i}. {question}" for i, question in enumerate(questions, 1))
+            try:
+                output = self.__multi_question_chain.invoke({
+                    "input": numbered,
+                    "context": _unique_documents(docs_per_question),
+                })
+            except OutputParserException as e:
+                print(f"LangChainBot:\tmulti-question answer is not JSON, answering one by one: {e}")
+                output = {}
+            for i, question in enumerate(questions, 1):
+                answer = output.get(str(i)) if isinstance(output, dict) else None
+                if answer:
+                    answers[question] = f"{answer}"
+        elif mode != "batch":
+            raise ValueError(f"Unknown mode {mode}, use 'batch' or 'single'")
+
+        todo = [i for i, question in enumerate(questions) if question not in answers]
+        if todo:
+            outputs = self.__combine_docs_configure.batch(
+                [
+                    {"input": questions[i], "context": docs_per_question[i], "chat_history": []}
+                    for i in todo
+                ],
+                config={"max_concurrency": max_concurrency},
+            )
+            for i, output in zip(todo, outputs):
+                answers[questions[i]] = output
+        return {question: answers[question] for question in questions}
+
+    def ask_question_set(
+            self,
+            name: str,
+            tenant_name: Optional[str] = None,
+            k: int = 10,
+            mode: str = "batch",
+            max_concurrency: int = 8,
+    ) -> Dict[str, str]:
+        '''ask_many on a named question set (src.utils.question_sets), its precomputed vectors skip the embedding call.'''
+        return self.ask_many(
+            question_sets.get_question_set(name),
+            tenant_name=tenant_name,
+            k=k,
+            mode=mode,
+            max_concurrency=max_concurrency,
+            question_vectors=question_sets.question_set_vectors(name, self.__llm_embedding),
+        )
+
     def ask_nona_sync(
             self,
             question: str,
@@ -0,0 +1,208 @@
+"""
+Structure-aware text splitters returned by utils.chunking.
+
+Sizes are measured with the splitter's length_function, utils.chunking passes the cached tiktoken
+counter so chunk_size and chunk_overlap are tokens. Every chunk is a slice of its source text and
+carries metadata["start_index"], its character offset in that text.
+"""
+import copy
+import re
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
+
+# Slides of a raw ppt are joined with it by utils.iter_shared_docs
+SLIDE_SEPARATOR = "\f"
+# Speaker turns of the AMI transcripts are separated by new lines (there are no speaker labels)
+TURN_SEPARATOR = "\n"
+
+
+def _spans(text: str, separator: str) -> List[Tuple[int, int]]:
+    """(start, end) of the non-blank parts of text between separators."""
+    spans, start = [], 0
+    for match in re.finditer(re.escape(separator), text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return [(s, e) for s, e in spans if text[s:e].strip()]
+
+
+def _pieces(text: str, pattern: str, offset: int) -> List[Tuple[int, str]]:
+    """Splits of _split_text_with_regex (keep_separator="start") with their offsets: a separator starts a piece."""
+    if not pattern:
+        return [(offset + i, char) for i, char in enumerate(text)]
+    starts = sorted({0, *(match.start() for match in re.finditer(pattern, text))})
+    ends = starts[1:] + [len(text)]
+    return [(offset + start, text[start:end]) for start, end in zip(starts, ends) if end > start]
+
+
+class _StartIndexMixin:
+    """
+    create_documents with exact offsets: the splitters track the offset of every piece they cut
+    (split_with_offsets), the base class guesses it from chunk_overlap, which is in characters.
+    """
+
+    def split_with_offsets(self, text: str) -> List[Tuple[int, str]]:
+        raise NotImplementedError
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for _, chunk in self.split_with_offsets(text)]
+
+    def create_documents(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[Document]:
+        metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for text, metadata in zip(texts, metadatas):
+            for index, chunk in self.split_with_offsets(text):
+                chunk_metadata = copy.deepcopy(metadata)
+                chunk_metadata["start_index"] = index
+                documents.append(Document(page_content=chunk, metadata=chunk_metadata))
+        return documents
+
+
+class TokenTextSplitter(_StartIndexMixin, RecursiveCharacterTextSplitter):
+    """
+    Recursive paragraph/sentence/word splitting, sized by length_function (tokens).
+    Same chunks as RecursiveCharacterTextSplitter (keep_separator=True), cut on (offset, piece) pairs.
+    """
+
+    def split_with_offsets(self, text: str) -> List[Tuple[int, str]]:
+        return self._split_spans(text, 0, self._separators)
+
+    def _split_spans(self, text: str, offset: int, separators: List[str]) -> List[Tuple[int, str]]:
+        separator, new_separators = separators[-1], []
+        for i, candidate in enumerate(separators):
+            pattern = candidate if self._is_separator_regex else re.escape(candidate)
+            if candidate == "":
+                separator = candidate
+                break
+            if re.search(pattern, text):
+                separator, new_separators = candidate, separators[i + 1:]
+                break
+        pattern = separator if self._is_separator_regex else re.escape(separator)
+        chunks: List[Tuple[int, str]] = []
+        good: List[Tuple[int, str]] = []
+        for start, piece in _pieces(text, pattern, offset):
+            if self._length_function(piece) < self._chunk_size:
+                good.append((start, piece))
+                continue
+            if good:
+                chunks.extend(self._merge_spans(good))
+                good = []
+            if new_separators:
+                chunks.extend(self._split_spans(piece, start, new_separators))
+            else:
+                chunks.append((start, piece))
+        if good:
+            chunks.extend(self._merge_spans(good))
+        return chunks
+
+    def _merge_spans(self, spans: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+        # TextSplitter._merge_splits with separator "": the pieces are contiguous, a chunk is one slice
+        separator_len = self._length_function("")
+        chunks: List[Tuple[int, str]] = []
+        current: List[Tuple[int, str]] = []
+        total = 0
+        for start, piece in spans:
+            length = self._length_function(piece)
+            if total + length + (separator_len if current else 0) > self._chunk_size and current:
+                chunks.extend(self._join_spans(current))
+                while total > self._chunk_overlap or (
+                    total + length + (separator_len if current else 0) > self._chunk_size and total > 0
+                ):
+                    total -= self._length_function(current[0][1]) + (separator_len if len(current) > 1 else 0)
+                    current = current[1:]
+            current.append((start, piece))
+            total += length + (separator_len if len(current) > 1 else 0)
+        chunks.extend(self._join_spans(current))
+        return chunks
+
+    def _join_spans(self, spans: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+        start, text = spans[0][0], "".join(piece for _, piece in spans)
+        if self._strip_whitespace:
+            stripped = text.lstrip()
+            start += len(text) - len(stripped)
+            text = stripped.rstrip()
+        return [(start, text)] if text else []
+
+
+class _StructureSplitter(_StartIndexMixin, TextSplitter):
+    """Base of the splitters on a structural separator, a part above chunk_size is split by tokens."""
+
+    separator = TURN_SEPARATOR
+
+    def __init__(self, separator: Optional[str] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if separator is not None:
+            self.separator = separator
+        self._fallback = TokenTextSplitter(
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap,
+            length_function=self._length_function,
+        )
+
+    def _split_part(self, text: str, start: int, end: int) -> List[Tuple[int, str]]:
+        # text[start:end] as one chunk, or split by tokens when it is above chunk_size
+        part = text[start:end]
+        if self._length_function(part) <= self._chunk_size:
+            return [(start, part)]
+        return [(start + index, chunk) for index, chunk in self._fallback.split_with_offsets(part)]
+
+
+class SlideSplitter(_StructureSplitter):
+    """One chunk per slide, slides are separated by SLIDE_SEPARATOR."""
+
+    separator = SLIDE_SEPARATOR
+
+    def split_with_offsets(self, text: str) -> List[Tuple[int, str]]:
+        chunks = []
+        for start, end in _spans(text, self.separator):
+            part = text[start:end]
+            start += len(part) - len(part.lstrip())
+            end -= len(part) - len(part.rstrip())
+            chunks.extend(self._split_part(text, start, end))
+        return chunks
+
+
+class TurnWindowSplitter(_StructureSplitter):
+    """
+    Windows of consecutive speaker turns up to chunk_size, a turn is never cut unless it is longer
+    than chunk_size on its own. Consecutive windows share their last overlap_turns turns.
+    """
+
+    separator = TURN_SEPARATOR
+
+    def __init__(self, overlap_turns: int = 1, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._overlap_turns = overlap_turns
+
+    def split_with_offsets(self, text: str) -> List[Tuple[int, str]]:
+        chunks: List[Tuple[int, str]] = []
+        window: List[Tuple[int, int, int]] = []  # (start, end, tokens) of the turns in the window
+
+        def flush() -> None:
+            if window:
+                chunks.append((window[0][0], text[window[0][0]:window[-1][1]]))
+
+        for start, end in _spans(text, self.separator):
+            num_tokens = self._length_function(text[start:end])
+            if num_tokens > self._chunk_size:
+                flush()
+                chunks.extend(self._split_part(text, start, end))
+                window = []
+                continue
+            # The turn joins the window with the separators in between
+            gap = self._length_function(text[window[-1][1]:start]) if window else 0
+            if window and sum(t for _, _, t in window) + gap + num_tokens > self._chunk_size:
+                flush()
+                window = window[len(window) - self._overlap_turns:] if self._overlap_turns else []
+                if window:
+                    # The first turn of a window has no separator before it
+                    window[0] = (window[0][0], window[0][1], self._length_function(text[window[0][0]:window[0][1]]))
+                while window and sum(t for _, _, t in window) + gap + num_tokens > self._chunk_size:
+                    window.pop(0)
+                gap = gap if window else 0
+            window.append((start, end, gap + num_tokens))
+        flush()
+        return chunks
+
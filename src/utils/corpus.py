@@ -0,0 +1,150 @@
+"""
+Columnar meeting corpus: the fields used by the experiments, one row per meeting, in one Parquet file.
+
+Ingest is incremental, only the meetings whose json file changed (by content hash) are parsed again.
+
+Example:
+    python -m src.utils.corpus --data-root DATA/AMI_MS_Cleaned --output DATA/corpus/meetings.parquet
+
+    from src.utils.corpus import load_corpus
+    df = load_corpus(columns=["meeting_id", "summary"])
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.utils import utils
+
+DEFAULT_DATA_ROOT = "DATA/AMI_MS_Cleaned"
+DEFAULT_CORPUS_PATH = "DATA/corpus/meetings.parquet"
+TEXT_COLUMNS = ("transcript", "summary", "actions", "decisions", "problems", "shared_docs")
+COLUMNS = (
+    "meeting_id",
+    "file",
+    "source_hash",
+    *TEXT_COLUMNS,
+    "num_tokens_transcripts",
+    "num_tokens_summary",
+    "num_tokens_shared_doc",
+    "category",
+    "description",
+)
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _as_text(value) -> str:
+    # Cleaned meetings hold strings, raw ones can hold lists/dicts (shared-doc) or None
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+def _shared_docs_text(value) -> str:
+    # Raw meetings hold the shared documents by type, they are joined as text like the generators do
+    if isinstance(value, dict):
+        return '\n'.join(utils.format_shared_doc(doc) for doc in utils.iter_shared_docs({"shared-doc": value}))
+    return _as_text(value)
+
+# Top-level keys of a meeting file that end up in the corpus, pens and whiteboard are never parsed
+SOURCE_KEYS = ("transcript", "summary", "actions", "decisions", "problems", "shared-doc")
+
+def _meeting_row(file: str, data_root: str, source_hash: str) -> Dict[str, Any]:
+    jsondict = utils.extract_data_from_file(file, root=data_root, keys=SOURCE_KEYS)
+    row = {
+        "meeting_id": os.path.splitext(file)[0],
+        "file": file,
+        "source_hash": source_hash,
+        "transcript": _as_text(jsondict.get("transcript")),
+        "summary": _as_text(jsondict.get("summary")),
+        "actions": _as_text(jsondict.get("actions")),
+        "decisions": _as_text(jsondict.get("decisions")),
+        "problems": _as_text(jsondict.get("problems")),
+        "shared_docs": _shared_docs_text(jsondict.get("shared-doc")),
+    }
+    row["num_tokens_transcripts"], row["num_tokens_summary"], row["num_tokens_shared_doc"] = (
+        utils.num_tokens_from_strings([row["transcript"], row["summary"], row["shared_docs"]])
+    )
+    try:
+        row["category"], row["description"] = utils.extract_category(file)
+    except Exception:
+        row["category"], row["description"] = None, None
+    return row
+
+def ingest(
+    data_root: str = DEFAULT_DATA_ROOT,
+    output: str = DEFAULT_CORPUS_PATH,
+    num_workers: int = 8,
+) -> Dict[str, int]:
+    """
+    Build or update the corpus from the meeting json files of data_root.
+    Meetings whose file hash is unchanged are kept as they are, removed files are dropped.
+    Returns the number of added, updated, unchanged and removed meetings.
+    """
+    files = sorted(f for f in os.listdir(data_root) if f.endswith(".json"))
+    with ThreadPoolExecutor(num_workers) as executor:
+        hashes = dict(zip(files, executor.map(lambda f: file_hash(os.path.join(data_root, f)), files)))
+
+    existing = pd.read_parquet(output) if os.path.exists(output) else pd.DataFrame(columns=list(COLUMNS))
+    known = dict(zip(existing["file"], existing["source_hash"]))
+    unchanged = [f for f in files if known.get(f) == hashes[f]]
+    todo = [f for f in files if known.get(f) != hashes[f]]
+    removed = [f for f in known if f not in hashes]
+
+    with ThreadPoolExecutor(num_workers) as executor:
+        rows = list(executor.map(lambda f: _meeting_row(f, data_root, hashes[f]), todo))
+    stats = {
+        "added": sum(f not in known for f in todo),
+        "updated": sum(f in known for f in todo),
+        "unchanged": len(unchanged),
+        "removed": len(removed),
+    }
+    if not todo and not removed:
+        return stats
+
+    kept = existing[existing["file"].isin(unchanged)]
+    corpus = pd.concat([kept, pd.DataFrame(rows, columns=list(COLUMNS))], ignore_index=True)
+    corpus = corpus.sort_values("meeting_id").reset_index(drop=True)
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    # Write then rename, readers never see a half-written file
+    tmp_path = f"{output}.tmp"
+    corpus.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, output)
+    return stats
+
+def load_corpus(
+    columns: Optional[List[str]] = None,
+    path: str = DEFAULT_CORPUS_PATH,
+    meetings: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Load the corpus, only the requested columns are read from disk.
+    meetings filters on meeting_id (e.g. ["ES2002a", "ES2002b"]).
+    """
+    if columns is not None and "meeting_id" not in columns:
+        columns = ["meeting_id", *columns]
+    filters = [("meeting_id", "in", list(meetings))] if meetings else None
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the columnar meeting corpus, only changed meetings are parsed")
+    parser.add_argument('--data-root', type=str, default=DEFAULT_DATA_ROOT,
+                        help='Folder of the meeting json files')
+    parser.add_argument('--output', type=str, default=DEFAULT_CORPUS_PATH,
+                        help='Parquet file of the corpus')
+    parser.add_argument('--num-workers', type=int, default=8)
+    args = parser.parse_args()
+    print(ingest(args.data_root, args.output, args.num_workers))
@@ -1,12 +1,16 @@
 from uuid import uuid4
 import random
 import os
-from typing import Any, Dict, List, Optional, Sequence, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from PyPDF2 import PdfReader 
 
 import streamlit as st
 from weaviate.classes.tenants import Tenant
+from weaviate.classes.aggregate import GroupByAggregate
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
 from langchain_weaviate.vectorstores import WeaviateVectorStore as WeaviateLC
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain_community.document_loaders import WebBaseLoader
@@ -15,27 +19,74 @@ from langchain_community.embeddings import OllamaEmbeddings
 
 import src.utils.utils as utils
 import src.config.db as config_db
-from src.driver import weaviatedb
-from contextlib import contextmanager
+from src.driver import weaviatedb, weaviatepool
+from src.driver.cachedb import DEFAULT_EMBEDDING_CACHE_PATH, SQLiteEmbeddingStore, embedding_model_name, text_hash
+from src.utils.index_manifest import IndexManifest, chunk_keys
+from contextlib import closing, contextmanager
 
 
 DEFAULT_NAME_ID = 'agenda_gen'
+# Bulk ingest: token budget and size of one embedding request (OpenAI accepts 300k tokens / 2048 inputs)
+EMBED_BATCH_TOKENS = 200000
+EMBED_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 200
+# Tenant scans: objects per request, and the server cap on offset + limit (QUERY_MAXIMUM_RESULTS)
+PAGE_SIZE = 1000
+QUERY_MAXIMUM_RESULTS = 10000
+# Metadata property the meeting ingest writes the source filename under
+SOURCE_METADATA_KEY = 'filename'
+# The batch of a client is not meant to be shared, pooled clients are, so bulk inserts take turns
+_batch_lock = threading.Lock()
 
 @contextmanager
 def managed_client():
-    client = config_db.get_client()
-    try:
+    # Clients are long-lived and shared through the pool, they are not closed after each call
+    with weaviatepool.get_pool().client() as client:
         yield client
-    finally:
-        client.close()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding model behind a persistent store (src.driver.cachedb.SQLiteEmbeddingStore):
+    a text already embedded by the same model is never sent again.
+    """
+
+    def __init__(self, embedding: Embeddings, store: SQLiteEmbeddingStore):
+        self.embedding = embedding
+        self.store = store
+        self.model_name = embedding_model_name(embedding)
+
+    def _embed(self, namespace: str, texts: List[str], embed) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.store.get_many(namespace, hashes)
+        missing = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+        if missing:
+            new_vectors = dict(zip(missing, embed(list(missing.values()))))
+            self.store.set_many(namespace, new_vectors)
+            vectors.update(new_vectors)
+        return [vectors[h] for h in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(self.model_name, texts, self.embedding.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Some models embed queries differently, they get their own namespace
+        return self._embed(
+            f"{self.model_name}:query", [text], lambda texts: [self.embedding.embed_query(texts[0])]
+        )[0]
 
 class VectorDB:
-    def __init__(self,model_config):
+    def __init__(self,model_config, embedding_cache_path: Optional[str] = DEFAULT_EMBEDDING_CACHE_PATH):
+        """
+        embedding_cache_path: sqlite file of the embedding store, unchanged chunks are not embedded again
+        (None disables it)
+        """
         self.model_config = model_config
         self.embedding = self.chose_llm_embedding(
             llm_model = 'OpenAI',
             model = 'text-embedding-3-small'
         )
+        if embedding_cache_path is not None:
+            self.embedding = CachedEmbeddings(self.embedding, SQLiteEmbeddingStore(embedding_cache_path))
         self.vectorstore = weaviatedb.WeaviateDB()
         # self.client = config_db.get_client()
     # The chose_llm_embedding function is rewirte in config/llm_config.py
@@ -52,15 +103,15 @@ class VectorDB:
             raise 'WE ONLY SUPPORT OpenAIEmbeddings AND OllamaEmbeddings'
         return embedding
     
-    def import_data_to_db(self, meta_data, page_content, index_name="", tenant_name="", text_key= 'text'):
-        # As a default we will create a new tenant 
+    def import_data_to_db(self, meta_data, page_content, index_name="", tenant_name="", text_key= 'text', source_type='txt'):
+        # As a default we will create a new tenant, the content is chunked for its source type (utils.chunking_for_source)
         try:
             if index_name == "":
                 index_name = os.environ.get("COLLECTION_ID")
         except :
             if tenant_name == "":
                 tenant_name = f"{DEFAULT_NAME_ID}_{uuid4().hex}"
-        text_splitter = utils.chunking(method='RecursiveCharacterTextSplitter')
+        text_splitter = utils.chunking_for_source(source_type)
         # client = config_db.get_client()
         embed_model = self.embedding
         doc = Document(
@@ -82,14 +133,14 @@ class VectorDB:
         
         return db._index_name, tenant_name, db._text_key, documents
 
-    def embedding_webpage_to_db(self, links: List[str], index_name="", tenant_name="",text_key = 'text'):
+    def embedding_webpage_to_db(self, links: List[str], index_name="", tenant_name="",text_key = 'text', source_type='txt'):
         # As a default we will create a new tenant 
         if index_name == "":
             index_name = os.environ.get("COLLECTION_ID")
         if tenant_name == "":
             tenant_name = f"{DEFAULT_NAME_ID}_{uuid4().hex}"
-        # [ RecursiveCharacterTextSplitter, CharacterTextSplitter]
-        text_splitter = utils.chunking(method='RecursiveCharacterTextSplitter')
+        # Token-sized chunks of the source type (utils.chunking_for_source)
+        text_splitter = utils.chunking_for_source(source_type)
         # client = config_db.get_client()
         embed_model = self.embedding
         documents = []
@@ -112,13 +163,13 @@ class VectorDB:
             )
         return db._index_name, tenant_name, db._text_key, documents
 
-    def embedding_pdf_to_db(self, pdf_file,  index_name="", tenant_name="",text_key = 'text'):
+    def embedding_pdf_to_db(self, pdf_file,  index_name="", tenant_name="",text_key = 'text', source_type='doc'):
         if index_name == "":
             index_name = os.environ.get("COLLECTION_ID")
         if tenant_name == "":
             tenant_name = f"{DEFAULT_NAME_ID}_{uuid4().hex}"
         documents = []
-        text_splitter = utils.chunking(method='RecursiveCharacterTextSplitter')
+        text_splitter = utils.chunking_for_source(source_type)
         embed_model = self.embedding
         reader = PdfReader(pdf_file)
         number_of_pages =  len(reader.pages)
@@ -158,6 +209,168 @@ class VectorDB:
             )
         return db._index_name, tenant_name, db._text_key, documents
 
+    def _embedding_batches(self, texts: List[str], batch_tokens: int, batch_size: int) -> List[List[int]]:
+        # Consecutive chunks are grouped while the request stays under the token and size budgets
+        batches, batch, tokens = [], [], 0
+        for i, num_tokens in enumerate(utils.num_tokens_from_strings(texts)):
+            if batch and (tokens + num_tokens > batch_tokens or len(batch) == batch_size):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(i)
+            tokens += num_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def bulk_import_to_db(
+        self,
+        tenant_documents: Dict[str, List[Document]],
+        index_name="",
+        text_key='text',
+        batch_tokens: int = EMBED_BATCH_TOKENS,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_workers: int = 4,
+        split: bool = True,
+        ids: Optional[Dict[str, List[str]]] = None,
+        source_type: str = 'txt',
+    ) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Embed and insert many documents across many tenants at once.
+        Arg:
+        - tenant_documents: {tenant_name: [Document, ...]}, missing tenants are created
+        - batch_tokens, batch_size: budget of one embedding request
+        - max_workers: embedding requests in flight, also the concurrent insert requests
+        - split: chunk the documents first, with the splitter of source_type (utils.chunking_for_source)
+        - ids: {tenant_name: [uuid, ...]} of the given documents, only with split=False (random uuids by default)
+        Objects are pushed with the client batch (gRPC) as soon as their embedding batch is back,
+        with the same properties as WeaviateLC.from_documents so the retrievers read them the same way.
+        Returns the object uuids per tenant and the errors of the failed objects.
+        """
+        if index_name == "":
+            index_name = os.environ.get("COLLECTION_ID")
+        if ids is not None and split:
+            raise ValueError("ids must match the given documents, use them with split=False")
+        text_splitter = utils.chunking_for_source(source_type)
+        chunks: List[Tuple[str, Document]] = []
+        uuids: List[str] = []
+        for tenant_name, documents in tenant_documents.items():
+            documents = text_splitter.split_documents(documents) if split else documents
+            chunks.extend((tenant_name, doc) for doc in documents)
+            if ids is not None:
+                uuids.extend(ids[tenant_name])
+            else:
+                uuids.extend(str(uuid4()) for _ in documents)
+        texts = [doc.page_content for _, doc in chunks]
+
+        with managed_client() as client:
+            # Creates the multi-tenant collection if it does not exist yet
+            WeaviateLC(client=client, index_name=index_name, text_key=text_key, use_multi_tenancy=True)
+            collection = client.collections.get(index_name)
+            existing = set(collection.tenants.get())
+            missing = [Tenant(name=name) for name in tenant_documents if name not in existing]
+            if missing:
+                collection.tenants.create(tenants=missing)
+
+            batches = self._embedding_batches(texts, batch_tokens, batch_size)
+            with _batch_lock, ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                    client.batch.fixed_size(batch_size=INSERT_BATCH_SIZE, concurrent_requests=max_workers) as batch:
+                futures = {
+                    executor.submit(self.embedding.embed_documents, [texts[i] for i in indices]): indices
+                    for indices in batches
+                }
+                for future in as_completed(futures):
+                    for i, vector in zip(futures[future], future.result()):
+                        tenant_name, doc = chunks[i]
+                        batch.add_object(
+                            collection=index_name,
+                            properties={text_key: doc.page_content, **doc.metadata},
+                            uuid=uuids[i],
+                            vector=vector,
+                            tenant=tenant_name,
+                        )
+            failed_objects = client.batch.failed_objects
+
+        errors = [f"{obj.original_uuid}: {obj.message}" for obj in failed_objects]
+        if errors:
+            print(f"bulk_import_to_db: {len(errors)} objects failed, first error: {errors[0]}")
+        failed = {str(obj.original_uuid) for obj in failed_objects}
+        tenant_uuids: Dict[str, List[str]] = {tenant_name: [] for tenant_name in tenant_documents}
+        for (tenant_name, _), uuid in zip(chunks, uuids):
+            if uuid not in failed:
+                tenant_uuids[tenant_name].append(uuid)
+        return tenant_uuids, errors
+
+    def sync_meeting_to_db(
+        self,
+        meeting: str,
+        sources: Dict[str, str],
+        manifest: IndexManifest,
+        index_name="",
+        text_key='text',
+        metadata_key=SOURCE_METADATA_KEY,
+        source_types: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Bring the tenant of one meeting in line with its current shared documents.
+        Arg:
+        - meeting: meeting file, e.g. ES2002a.json
+        - sources: {filename: content} of every shared document of the meeting
+        - manifest: records the tenant, chunk hashes and object uuids of the meeting
+        - source_types: {filename: txt/doc/ppt/transcript}, chunks each source with utils.chunking_for_source
+          (token-sized, one slide per chunk for ppt), sources missing from it (or every source without it)
+          are chunked as txt
+        The meeting keeps its tenant (a new one is created the first time). Only the chunks that are not
+        in the manifest are embedded and inserted, chunks and sources that disappeared are deleted.
+        """
+        if index_name == "":
+            index_name = os.environ.get("COLLECTION_ID")
+        tenant_name = manifest.tenant(meeting) or f"{DEFAULT_NAME_ID}_{uuid4().hex}"
+        state: Dict[str, Dict[str, str]] = {}
+        new_documents, new_ids, delete_ids = [], [], []
+        for source, content in sources.items():
+            source_type = source_types.get(source) if source_types is not None else 'txt'
+            if source_type is None:
+                print(f"sync_meeting_to_db: {meeting}/{source} has no source type, chunked as txt")
+                source_type = 'txt'
+            documents = utils.chunking_for_source(source_type).create_documents(
+                [content], metadatas=[{metadata_key: source}]
+            )
+            known = manifest.chunks(meeting, source)
+            state[source] = {}
+            for key, doc in zip(chunk_keys([doc.page_content for doc in documents]), documents):
+                if key in known:
+                    state[source][key] = known[key]
+                else:
+                    state[source][key] = str(uuid4())
+                    new_documents.append(doc)
+                    new_ids.append(state[source][key])
+            delete_ids.extend(uuid for key, uuid in known.items() if key not in state[source])
+        for source in manifest.sources(meeting):
+            if source not in sources:
+                delete_ids.extend(manifest.chunks(meeting, source).values())
+
+        errors = []
+        if new_documents:
+            tenant_uuids, errors = self.bulk_import_to_db(
+                {tenant_name: new_documents}, index_name=index_name, text_key=text_key,
+                split=False, ids={tenant_name: new_ids},
+            )
+            # Failed chunks stay out of the manifest and are retried on the next sync
+            failed = set(new_ids) - set(tenant_uuids[tenant_name])
+            for source in state:
+                state[source] = {key: uuid for key, uuid in state[source].items() if uuid not in failed}
+        if delete_ids:
+            self.delete_id_from_vectordb(index_name=index_name, text_key=text_key, tenant_name=tenant_name, ids=delete_ids)
+        manifest.set_meeting(meeting, index_name, tenant_name, state)
+        manifest.save()
+        return {
+            "tenant": tenant_name,
+            "inserted": len(new_documents) - len(errors),
+            "deleted": len(delete_ids),
+            "unchanged": sum(len(chunks) for chunks in state.values()) - len(new_documents) + len(errors),
+            "errors": errors,
+        }
+
     def delete_collections_from_vectordb(self, index_name):
         with managed_client() as client:
             client.collections.delete(index_name)
@@ -205,50 +418,106 @@ class VectorDB:
             response = my_tenant.query.fetch_object_by_id(uuid=object_id)
         return response  
 
-    def get_all_source_from_tenant(self, tenant_name, index_name=""):
+    def iter_tenant_objects(
+        self,
+        tenant_name,
+        index_name="",
+        page_size: int = PAGE_SIZE,
+        return_properties: Optional[List[str]] = None,
+    ) -> Iterator[Any]:
+        """
+        Yield every object of a tenant, page by page with the uuid cursor (after=),
+        so a large tenant is scanned in constant memory.
+        return_properties: properties to fetch (None means all), vectors are never fetched.
+        """
+        if index_name == "":
+            index_name = os.environ.get("COLLECTION_ID")
         with managed_client() as client:
-            if index_name == "":
-                index_name = os.environ.get("COLLECTION_ID")
-            try:
-                multi_collection = client.collections.get(index_name)
-                my_tenant = multi_collection.with_tenant(tenant_name)
-                response = my_tenant.query.fetch_objects(include_vector=False)
-                source = list(set([ob.properties.get("source") for ob in response.objects]))
-                error = ''
-            except Exception as e:
-                error = f'{e}'
+            my_tenant = client.collections.get(index_name).with_tenant(tenant_name)
+            after = None
+            while True:
+                response = my_tenant.query.fetch_objects(
+                    limit=page_size, after=after, include_vector=False, return_properties=return_properties,
+                )
+                yield from response.objects
+                if len(response.objects) < page_size:
+                    break
+                after = response.objects[-1].uuid
+
+    def count_tenant_objects(self, tenant_name, index_name="") -> int:
+        if index_name == "":
+            index_name = os.environ.get("COLLECTION_ID")
+        with managed_client() as client:
+            my_tenant = client.collections.get(index_name).with_tenant(tenant_name)
+            return my_tenant.aggregate.over_all(total_count=True).total_count
+
+    def get_all_source_from_tenant(self, tenant_name, index_name="", metadata_key=SOURCE_METADATA_KEY):
+        """
+        Distinct values of metadata_key in the tenant, grouped by the server (no object is fetched).
+        metadata_key: property the source was written under, 'filename' for the meeting ingest
+        (sync_meeting_to_db), 'source' for the pdf upload (embedding_pdf_to_db).
+        """
+        source, error = [], ''
+        if index_name == "":
+            index_name = os.environ.get("COLLECTION_ID")
+        try:
+            with managed_client() as client:
+                my_tenant = client.collections.get(index_name).with_tenant(tenant_name)
+                response = my_tenant.aggregate.over_all(group_by=GroupByAggregate(prop=metadata_key), total_count=True)
+                source = [group.grouped_by.value for group in response.groups]
+        except Exception as e:
+            error = f'{e}'
         return source, error
 
-    def choice_random_text(self, tenant_name, index_name=""):
+    def sample_tenant_objects(self, tenant_name, index_name="", k: int = 1, return_properties: Optional[List[str]] = None):
+        """
+        k random objects of the tenant, one request per object at a random offset.
+        Offsets are capped by the server at QUERY_MAXIMUM_RESULTS, so a larger tenant is scanned with
+        the cursor up to the last picked position instead.
+        """
+        if index_name == "":
+            index_name = os.environ.get("COLLECTION_ID")
+        count = self.count_tenant_objects(tenant_name, index_name)
+        if count == 0:
+            return []
+        positions = random.sample(range(count), min(k, count))
+        if count > QUERY_MAXIMUM_RESULTS:
+            wanted, sample = set(positions), []
+            with closing(self.iter_tenant_objects(tenant_name, index_name, return_properties=return_properties)) as objects:
+                for position, ob in enumerate(objects):
+                    if position in wanted:
+                        sample.append(ob)
+                        if len(sample) == len(wanted):
+                            break
+            random.shuffle(sample)
+            return sample
         with managed_client() as client:
-            if index_name == "":
-                index_name = os.environ.get("COLLECTION_ID")
-            multi_collection = client.collections.get(index_name)
-            my_tenant = multi_collection.with_tenant(tenant_name)
-            response = my_tenant.query.fetch_objects(include_vector=False)
-            object = random.choice(response.objects)
-            text = utils.preprocess_text_for_markdown(object.properties['text'])
+            my_tenant = client.collections.get(index_name).with_tenant(tenant_name)
+            return [
+                my_tenant.query.fetch_objects(
+                    limit=1, offset=offset, include_vector=False, return_properties=return_properties,
+                ).objects[0]
+                for offset in positions
+            ]
+
+    def choice_random_text(self, tenant_name, index_name=""):
+        object = self.sample_tenant_objects(tenant_name, index_name, k=1, return_properties=['text'])[0]
+        text = utils.preprocess_text_for_markdown(object.properties['text'])
         return text
 
-    def get_all_docs(self, tenant_name, index_name=''):
-        with managed_client() as client:
-            if index_name == "":
-                index_name = os.environ.get("COLLECTION_ID")
-            multi_collection = client.collections.get(index_name)
-            my_tenant = multi_collection.with_tenant(tenant_name)
-            response = my_tenant.query.fetch_objects(include_vector=False)
-            tenant_docs = []
-            for ob in response.objects:
-                text = ob.properties['text']
-                metadata = {
-                    'source': ob.properties['text'],
-                    'page': ob.properties['page']
-                }
-                doc = Document(
-                    metadata=metadata,
-                    page_content=text,
-                )
-                tenant_docs.append(doc)
+    def get_all_docs(self, tenant_name, index_name='', page_size: int = PAGE_SIZE):
+        tenant_docs = []
+        for ob in self.iter_tenant_objects(tenant_name, index_name, page_size, return_properties=['text', 'page']):
+            text = ob.properties['text']
+            metadata = {
+                'source': ob.properties['text'],
+                'page': ob.properties['page']
+            }
+            doc = Document(
+                metadata=metadata,
+                page_content=text,
+            )
+            tenant_docs.append(doc)
         return tenant_docs
     
 def extract_link_objects_from_document(
@@ -1,4 +1,6 @@
 from src.service.genbot import Two_Input_Assistance, Simple_Assistance, Triple_Input_Assistance
+from src.utils import utils
+from src.utils.llm_models import bind_params
 
 from langchain.prompts import PromptTemplate
 from langchain.chains.combine_documents import create_stuff_documents_chain
@@ -6,25 +8,45 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 class Generation:
     def __init__(
         self,
-        prompt_config
+        prompt_config,
+        cache=None,
+        digest_cache=None,
     ):
+        """
+        Arg:
+        - prompt_config: prompts loaded from prompt_config.yml
+        - cache: optional llm response cache shared by every strategy (src.driver.cachedb)
+        - digest_cache: optional cache of the shared document digests (digest_shared_docs), defaults to cache
+
+        Every generate_* method returns {"text", "__run"} by default.
+        With stream=True it returns a generator of tokens instead, and on_item(text)
+        is called each time a top-level agenda item is complete.
+        """
         self.prompt_config = prompt_config
+        self.cache = cache
+        self.digest_cache = digest_cache if digest_cache is not None else cache
         self.default_param = {
             "temperature":0.7,
             "top_p":0.8, 
             "max_retries":2,
         }
+    def _bind_params(self, llm, params):
+        """Bind the sampling params of this call (default_param when empty) to the llm."""
+        if params == {}:
+            params = self.default_param
+        return bind_params(llm, params)
     def generate_recap_agenda(
         self,
         llm, 
         transcript,
         summary, 
         prompt="",
-        params = {},        
+        params = {},
+        stream=False,
+        on_item=None,
     ):
         # Set model para
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         # Set prompt
         if prompt == "":        
@@ -36,9 +58,12 @@ class Generation:
             "input1": transcript,
             "input2": summary,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Two_Input_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
     def generate_agenda_template(
@@ -47,9 +72,10 @@ class Generation:
             agendas,
             prompt="",
             params = {},
+            stream=False,
+            on_item=None,
     ):
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         # Set prompt
         if prompt == "":        
@@ -60,9 +86,12 @@ class Generation:
             "template": prompt,
             "content": agendas,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Simple_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
     def generate_truncated_sigle_input_agenda(
@@ -71,9 +100,10 @@ class Generation:
             shared_docs,
             prompt="",
             params = {},
+            stream=False,
+            on_item=None,
     ):
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         # Set prompt
         if prompt == "":        
@@ -84,9 +114,12 @@ class Generation:
             "template": prompt,
             "content": shared_docs,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Simple_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
     def generate_truncated_multi_input_agenda(
@@ -95,9 +128,10 @@ class Generation:
             shared_docs,
             prompt="",
             params = {},
+            stream=False,
+            on_item=None,
     ):
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         
         # Set prompt
@@ -108,9 +142,12 @@ class Generation:
             "template": prompt,
             "content": shared_docs,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Simple_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
     def generate_category_truncated_multi_input_agenda(
@@ -121,9 +158,10 @@ class Generation:
             description,
             prompt="",
             params = {},
+            stream=False,
+            on_item=None,
     ):
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         
         # Set prompt
@@ -136,9 +174,12 @@ class Generation:
             "input2": description,
             "input3": shared_docs,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Triple_Input_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
     
@@ -148,9 +189,10 @@ class Generation:
             qa_text,
             prompt="",
             params = {},
+            stream=False,
+            on_item=None,
     ):
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         # Set prompt
         if prompt == "":        
@@ -161,9 +203,12 @@ class Generation:
             "template": prompt,
             "content": qa_text,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Simple_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
     
@@ -175,9 +220,10 @@ class Generation:
             qa_text,
             prompt="",
             params = {},
+            stream=False,
+            on_item=None,
     ):
-        if params == {}:
-            params = self.default_param
+        llm = self._bind_params(llm, params)
         
         # Set prompt
         if prompt == "":        
@@ -190,11 +236,73 @@ class Generation:
             "input2": description,
             "input3": qa_text,
             "llm": llm, 
+            "cache": self.cache,
         }
 
         bot = Triple_Input_Assistance(**assistant_param)
+        if stream:
+            return bot.stream(on_item=on_item)
         response = bot()
         return response
+    def digest_shared_docs(
+            self,
+            llm,
+            shared_docs,
+            prompt="",
+            params = {},
+            max_doc_tokens=16000,
+            max_concurrency=8,
+    ):
+        """
+        Summarize every shared document in parallel, one call per document.
+        shared_docs are the documents of utils.iter_shared_docs. Digests go through digest_cache, keyed by
+        the document content, the prompt and the model, so a document shared by several meetings
+        (or already digested by an earlier run) is only summarized once.
+        Returns the digests as documents, in the same order.
+        """
+        llm = self._bind_params(llm, params)
+        if prompt == "":
+            prompt = self.prompt_config['prompt']['summarized_shared_doc_prompt']
+        contents = [
+            utils.truncate_shared_docs(utils.format_shared_doc(doc), max_tokens=max_doc_tokens, strategy="middle")
+            for doc in shared_docs
+        ]
+        if not contents:
+            return []
+        bot = Simple_Assistance(prompt, "", llm, max_concurrency=max_concurrency, cache=self.digest_cache)
+        responses = bot.batch([{"content": content} for content in contents])
+        return [{**doc, "content": response["text"]} for doc, response in zip(shared_docs, responses)]
+    def generate_digest_multi_input_agenda(
+            self,
+            llm,
+            shared_docs,
+            prompt="",
+            params = {},
+            stream=False,
+            on_item=None,
+            max_doc_tokens=16000,
+            max_concurrency=8,
+    ):
+        """
+        Same agenda as generate_truncated_multi_input_agenda, generated from per-document digests
+        (digest_shared_docs) instead of the truncated concatenation of every shared document.
+        """
+        digests = self.digest_shared_docs(
+            llm,
+            shared_docs,
+            params=params,
+            max_doc_tokens=max_doc_tokens,
+            max_concurrency=max_concurrency,
+        )
+        digest_text = '\n'.join(utils.format_shared_doc(doc) for doc in digests)
+        return self.generate_truncated_multi_input_agenda(
+            llm,
+            digest_text,
+            prompt=prompt,
+            params=params,
+            stream=stream,
+            on_item=on_item,
+        )
     def summarized_by_stuff(
             self,
             llm,
@@ -210,5 +318,92 @@ class Generation:
                 )
         return stuff_chain.invoke({"text": docs})
 
+    def _split_docs(self, docs, chunk_size, chunk_overlap):
+        # docs: list of Document or plain text
+        text_splitter = utils.chunking(
+            method='RecursiveCharacterTextSplitter',
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+        if isinstance(docs, str):
+            return text_splitter.split_text(docs)
+        return [doc.page_content for doc in text_splitter.split_documents(docs)]
+
+    def _summarize_batch(self, llm, template, contents, max_concurrency):
+        bot = Simple_Assistance(template, "", llm, max_concurrency=max_concurrency, cache=self.cache)
+        responses = bot.batch([{"content": content} for content in contents])
+        return [response["text"] for response in responses]
 
-    
\ No newline at end of file
+    def summarized_by_map_reduce(
+            self,
+            llm,
+            docs,
+            params = {},
+            chunk_size=12000,
+            chunk_overlap=200,
+            token_max=8000,
+            max_concurrency=8,
+        ):
+        """
+        Summarize documents of any length.
+        Map: every chunk is summarized in parallel.
+        Reduce: the summaries are collapsed in groups of at most token_max tokens, in parallel,
+        until they fit in one final call.
+        Every call runs with params (default_param when empty).
+        """
+        llm = self._bind_params(llm, params)
+        map_prompt = self.prompt_config['prompt']["summarized_by_map_prompt"]
+        reduce_prompt = self.prompt_config['prompt']["summarized_by_reduce_prompt"]
+        chunks = self._split_docs(docs, chunk_size, chunk_overlap)
+        if not chunks:
+            return ""
+        summaries = self._summarize_batch(llm, map_prompt, chunks, max_concurrency)
+        while len(summaries) > 1 and sum(utils.num_tokens_from_strings(summaries)) > token_max:
+            groups = self._group_by_tokens(summaries, token_max)
+            if len(groups) == len(summaries):
+                # Every summary is already above token_max on its own, collapse them pairwise
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            summaries = self._summarize_batch(
+                llm, reduce_prompt, ['\n\n'.join(group) for group in groups], max_concurrency
+            )
+        if len(summaries) == 1:
+            return summaries[0]
+        return self._summarize_batch(llm, reduce_prompt, ['\n\n'.join(summaries)], max_concurrency)[0]
+
+    @staticmethod
+    def _group_by_tokens(summaries, token_max):
+        # Consecutive summaries are grouped while the group stays under token_max
+        groups, group, group_tokens = [], [], 0
+        for summary, num_tokens in zip(summaries, utils.num_tokens_from_strings(summaries)):
+            if group and group_tokens + num_tokens > token_max:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(summary)
+            group_tokens += num_tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    def summarized_by_refine(
+            self,
+            llm,
+            docs,
+            params = {},
+            chunk_size=12000,
+            chunk_overlap=200,
+        ):
+        """
+        Summarize documents of any length by refining a running summary chunk after chunk.
+        Sequential, but each call only sees the summary so far and one chunk.
+        Every call runs with params (default_param when empty).
+        """
+        llm = self._bind_params(llm, params)
+        map_prompt = self.prompt_config['prompt']["summarized_by_map_prompt"]
+        refine_prompt = self.prompt_config['prompt']["summarized_by_refine_prompt"]
+        chunks = self._split_docs(docs, chunk_size, chunk_overlap)
+        if not chunks:
+            return ""
+        summary = Simple_Assistance(map_prompt, chunks[0], llm, cache=self.cache)()["text"]
+        for chunk in chunks[1:]:
+            summary = Two_Input_Assistance(refine_prompt, summary, chunk, llm, cache=self.cache)()["text"]
+        return summary
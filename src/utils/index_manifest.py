@@ -0,0 +1,77 @@
+"""
+Indexing manifest of the RAG collection: for every meeting, its tenant and, per source file,
+the hash of each chunk with the uuid of its Weaviate object.
+
+VectorDB.sync_meeting_to_db diffs a meeting against it, so only new chunks are embedded
+and only removed chunks are deleted.
+"""
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.driver.cachedb import text_hash
+
+DEFAULT_MANIFEST_PATH = "rag_monitoring/index_manifest.json"
+DEFAULT_TENANT_CSV_PATH = "rag_monitoring/tenant_id.csv"
+
+
+def chunk_keys(texts: List[str]) -> List[str]:
+    """Key of each chunk: hash of its text and its occurrence number, a repeated chunk keeps its own object."""
+    seen: Counter = Counter()
+    keys = []
+    for text in texts:
+        digest = text_hash(text)
+        keys.append(f"{digest}:{seen[digest]}")
+        seen[digest] += 1
+    return keys
+
+
+class IndexManifest:
+    """
+    json file of {meeting: {"index_name", "tenant", "sources": {source: {chunk_key: uuid}}}}.
+    Arg:
+    - path: manifest file, it is created on the first save
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.meetings: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.meetings = json.load(f)
+
+    def tenant(self, meeting: str) -> Optional[str]:
+        return self.meetings.get(meeting, {}).get("tenant")
+
+    def sources(self, meeting: str) -> List[str]:
+        return list(self.meetings.get(meeting, {}).get("sources", {}))
+
+    def chunks(self, meeting: str, source: str) -> Dict[str, str]:
+        return dict(self.meetings.get(meeting, {}).get("sources", {}).get(source, {}))
+
+    def set_meeting(self, meeting: str, index_name: str, tenant: str, sources: Dict[str, Dict[str, str]]) -> None:
+        self.meetings[meeting] = {"index_name": index_name, "tenant": tenant, "sources": sources}
+
+    def remove_meeting(self, meeting: str) -> None:
+        self.meetings.pop(meeting, None)
+
+    def save(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write then rename, a crash never leaves a half-written manifest behind
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meetings, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def to_tenant_csv(self, path: str = DEFAULT_TENANT_CSV_PATH) -> pd.DataFrame:
+        """Write the meeting -> tenant table read by the RAG notebooks (columns file, tenant_id)."""
+        df = pd.DataFrame(
+            [{"file": meeting, "tenant_id": entry["tenant"]} for meeting, entry in self.meetings.items()],
+            columns=["file", "tenant_id"],
+        )
+        df.to_csv(path, mode="w", header=True, index=False)
+        return df
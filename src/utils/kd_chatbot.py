@@ -1,8 +1,13 @@
 from src.service.langchainbot import LangChainBot
+from src.utils import question_sets
+import json
 import os 
+import pandas as pd
 
 INDEX = os.environ.get("COLLECTION_ID")
 TEXT_KEY = "text"
+# Fixed questions asked to every meeting, the answers (qa_by_rag) feed the RAG agenda strategies
+QUESTIONS_LIST = question_sets.get_question_set("agenda")
 def start_chatbot(config_llm, tenant_name, index=INDEX, text_key=TEXT_KEY, debug=False, is_use_redis = True):
     try:
         config = config_llm.chose_llm_model(use_redis=is_use_redis)
@@ -19,3 +24,18 @@ def start_chatbot(config_llm, tenant_name, index=INDEX, text_key=TEXT_KEY, debug
         else:
             chatbot = None
     return chatbot
+
+def write_qa_by_rag(chatbot, tenant_csv, output_root, question_set="agenda", k=10, mode="batch"):
+    '''
+    Ask a question set to every meeting of tenant_csv (columns file, tenant_id) with LangChainBot.ask_question_set
+    and write one {file, qa} json per meeting in output_root, meetings already written are skipped.
+    '''
+    os.makedirs(output_root, exist_ok=True)
+    for _, row in pd.read_csv(tenant_csv).iterrows():
+        path = os.path.join(output_root, row['file'])
+        if os.path.exists(path):
+            continue
+        qa = chatbot.ask_question_set(question_set, tenant_name=row['tenant_id'], k=k, mode=mode)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'file': row['file'], 'qa': qa}, f, ensure_ascii=False, indent=4)
+        print(f"Finish {row['file']}")
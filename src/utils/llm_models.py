@@ -1,6 +1,11 @@
 from langchain_openai import ChatOpenAI
 from langchain_ollama import ChatOllama
 
+# Settings of the client itself, they are set when the model is built and cannot be sent with one request
+CLIENT_PARAMS = ("max_retries", "timeout", "streaming", "callbacks")
+# Ollama names some sampling parameters differently
+OLLAMA_PARAM_NAMES = {"max_tokens": "num_predict"}
+
 def get_llm_model(chatmodel: str, model_name: str, param: dict, stream_handler=None):
     param['model'] = model_name    
     if stream_handler is not None:
@@ -13,4 +18,17 @@ def get_llm_model(chatmodel: str, model_name: str, param: dict, stream_handler=N
     else:
         raise ValueError(f"We currently just support OpenAI and Ollama, your client is {chatmodel}")
     
-    return llm
\ No newline at end of file
+    return llm
+
+def bind_params(llm, params: dict):
+    """
+    Return the llm with per-call sampling parameters (temperature, top_p, max_tokens, stop, ...).
+    Client settings such as max_retries are skipped, they come from get_llm_model.
+    """
+    params = {k: v for k, v in params.items() if k not in CLIENT_PARAMS}
+    if not params:
+        return llm
+    if isinstance(llm, ChatOllama):
+        # ChatOllama rejects unknown call kwargs, its sampling options are model fields read on every call
+        return llm.model_copy(update={OLLAMA_PARAM_NAMES.get(k, k): v for k, v in params.items()})
+    return llm.bind(**params)
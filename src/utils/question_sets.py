@@ -0,0 +1,105 @@
+"""
+Named sets of fixed questions and their embeddings.
+
+The questions of a set are the same for every meeting, so their vectors are computed once per embedding
+model and kept in the embedding store (src.driver.cachedb.SQLiteEmbeddingStore), retrieval then searches
+by vector without any embedding call.
+
+Example:
+    from src.utils import question_sets
+    questions = question_sets.get_question_set("agenda")
+    vectors = question_sets.question_set_vectors("agenda", embedding)
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.driver.cachedb import (
+    DEFAULT_EMBEDDING_CACHE_PATH,
+    SQLiteEmbeddingStore,
+    embedding_model_name,
+    text_hash,
+)
+
+QUESTION_SETS: Dict[str, List[str]] = {
+    # Questions asked to every meeting to build qa_by_rag
+    "agenda": [
+        "What are the main objectives and focus areas of the meeting?",
+        "Who are the participants, and what are their roles?",
+        "What are the latest updates on assigned tasks and significant developments?",
+        "What previous action items are still pending, and what challenges were faced?",
+        "What major topics need to be discussed, and what insights have been shared?",
+        "What challenges are currently being faced, and what solutions have been proposed?",
+        "What key decisions need to be made, and what are their implications?",
+        "What are the next steps, assigned tasks, and deadlines?",
+        "What follow-up actions and plans are required for the next meeting?",
+    ],
+}
+# Set used by the first qa_by_rag run (generate_rag_multi_input_agenda.ipynb), without the participants
+QUESTION_SETS["agenda_without_participants"] = [
+    question for question in QUESTION_SETS["agenda"] if not question.startswith("Who are the participants")
+]
+
+_store: Optional[SQLiteEmbeddingStore] = None
+_vectors: Dict[Tuple[str, str], List[List[float]]] = {}
+_lock = threading.Lock()
+
+
+def register_question_set(name: str, questions: List[str], overwrite: bool = False) -> None:
+    if name in QUESTION_SETS and not overwrite and QUESTION_SETS[name] != list(questions):
+        raise ValueError(f"Question set {name} already exists, use overwrite=True to replace it")
+    with _lock:
+        QUESTION_SETS[name] = list(questions)
+        for key in [key for key in _vectors if key[0] == name]:
+            del _vectors[key]
+
+def get_question_set(name: str) -> List[str]:
+    if name not in QUESTION_SETS:
+        raise KeyError(f"Unknown question set {name}, known sets: {sorted(QUESTION_SETS)}")
+    return list(QUESTION_SETS[name])
+
+def _default_store() -> SQLiteEmbeddingStore:
+    global _store
+    if _store is None:
+        _store = SQLiteEmbeddingStore(DEFAULT_EMBEDDING_CACHE_PATH)
+    return _store
+
+def _unwrap(embedding, store: Optional[SQLiteEmbeddingStore]):
+    """The model and store behind a src.utils.embedding.CachedEmbeddings, other models are kept as is."""
+    if isinstance(getattr(embedding, "store", None), SQLiteEmbeddingStore):
+        return embedding.embedding, store if store is not None else embedding.store
+    return embedding, store
+
+def embed_questions(
+    questions: List[str],
+    embedding,
+    store: Optional[SQLiteEmbeddingStore] = None,
+) -> List[List[float]]:
+    """
+    Query vectors of the questions, only the questions never embedded by this model are sent to it.
+    They share the "<model>:query" namespace of src.utils.embedding.CachedEmbeddings.embed_query:
+    a CachedEmbeddings is unwrapped, its inner model names the namespace and its store is used.
+    """
+    embedding, store = _unwrap(embedding, store)
+    store = store if store is not None else _default_store()
+    namespace = f"{embedding_model_name(embedding)}:query"
+    hashes = [text_hash(question) for question in questions]
+    vectors = store.get_many(namespace, hashes)
+    missing = {h: question for h, question in zip(hashes, questions) if h not in vectors}
+    if missing:
+        # embed_query keeps the query instruction of models that have one (e.g. Ollama)
+        new_vectors = {h: embedding.embed_query(question) for h, question in missing.items()}
+        store.set_many(namespace, new_vectors)
+        vectors.update(new_vectors)
+    return [vectors[h] for h in hashes]
+
+def question_set_vectors(
+    name: str,
+    embedding,
+    store: Optional[SQLiteEmbeddingStore] = None,
+) -> List[List[float]]:
+    """Vectors of a named set, in the order of get_question_set(name); kept in memory after the first call."""
+    key = (name, embedding_model_name(_unwrap(embedding, store)[0]))
+    with _lock:
+        if key not in _vectors:
+            _vectors[key] = embed_questions(get_question_set(name), embedding, store)
+        return _vectors[key]
@@ -1,30 +1,67 @@
 import re
 from langchain_text_splitters import RecursiveCharacterTextSplitter, CharacterTextSplitter
+from src.utils import chunker
 import requests
 import yaml
 import re 
 import tiktoken
 import pandas as pd
 import json
+import hashlib
+import threading
+import ijson
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-def chunking(method: str):
-    """return TextSplitter with one chunking method"""
+TRUNCATE_STRATEGIES = ("head", "tail", "middle")
+# Memo of token counts keyed by (encoding name, content hash), least recently used entries are evicted first
+TOKEN_COUNT_CACHE_SIZE = 4096
+_token_count_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+_token_count_lock = threading.Lock()
+_SCALAR_EVENTS = ("string", "number", "boolean", "null", "end_map", "end_array")
+
+# Chunking method of each source type, see chunking_for_source
+SOURCE_CHUNKING = {
+    "txt": "TokenTextSplitter",
+    "doc": "TokenTextSplitter",
+    "ppt": "SlideSplitter",
+    "transcript": "TurnWindowSplitter",
+}
+
+def chunking(method: str, chunk_size: int = 1000, chunk_overlap: int = 200):
+    """
+    return TextSplitter with one chunking method
+    The character splitters count characters. TokenTextSplitter, SlideSplitter and TurnWindowSplitter
+    (src/utils/chunker.py) count tokens with the cached tokenizer and add start_index to the chunk metadata.
+    """
+    if method in ('TokenTextSplitter', 'SlideSplitter', 'TurnWindowSplitter'):
+        return getattr(chunker, method)(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=num_tokens_from_string,
+        )
     if method == 'RecursiveCharacterTextSplitter':
         return RecursiveCharacterTextSplitter(
             # Set a really small chunk size, just to show.
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
             length_function=len,
         )
     elif method == 'CharacterTextSplitter':
         return CharacterTextSplitter(
             separator=" ",
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
             length_function=len,
             is_separator_regex=False,
         )
 
+def chunking_for_source(source_type: str, chunk_size: int = 1000, chunk_overlap: int = 200):
+    """return the token-aware TextSplitter of a source type (txt, doc, ppt or transcript)"""
+    return chunking(SOURCE_CHUNKING.get(source_type, 'TokenTextSplitter'), chunk_size, chunk_overlap)
+
 def reformat_text(text):
     """Drop multiple spaces, tabs, endlines."""
     return " ".join(text.split())
@@ -90,57 +127,139 @@ def clean_text(raw_text):
     cleaned_text = re.sub(r'^ +', '', cleaned_text, flags=re.MULTILINE)
     return cleaned_text.strip()  # Remove leading/trailing spaces
 
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Returns the process-wide tiktoken encoding, it is built once per name."""
+    return tiktoken.get_encoding(encoding_name)
+
+def _token_cache_key(string: str, encoding_name: str) -> Tuple[str, str]:
+    digest = hashlib.sha1(string.encode("utf-8", errors="surrogatepass")).hexdigest()
+    return encoding_name, digest
+
+def _get_cached_num_tokens(key: Tuple[str, str]) -> Optional[int]:
+    with _token_count_lock:
+        num_tokens = _token_count_cache.get(key)
+        if num_tokens is not None:
+            _token_count_cache.move_to_end(key)
+        return num_tokens
+
+def _set_cached_num_tokens(key: Tuple[str, str], num_tokens: int) -> None:
+    with _token_count_lock:
+        _token_count_cache[key] = num_tokens
+        _token_count_cache.move_to_end(key)
+        while len(_token_count_cache) > TOKEN_COUNT_CACHE_SIZE:
+            _token_count_cache.popitem(last=False)
+
 def num_tokens_from_string(string: str, encoding_name: str = "cl100k_base") -> int:
     """Returns the number of tokens in a text string."""
-    
-    encoding = tiktoken.get_encoding(encoding_name)
-    num_tokens = len(encoding.encode(string))
+    key = _token_cache_key(string, encoding_name)
+    num_tokens = _get_cached_num_tokens(key)
+    if num_tokens is None:
+        num_tokens = len(get_encoding(encoding_name).encode(string))
+        _set_cached_num_tokens(key, num_tokens)
     return num_tokens
 
+def num_tokens_from_strings(strings: List[str], encoding_name: str = "cl100k_base", num_threads: int = 8) -> List[int]:
+    """
+    Returns the number of tokens of each text string.
+    Cached strings are answered from the memo, the others are encoded together with encode_batch.
+    """
+    keys = [_token_cache_key(string, encoding_name) for string in strings]
+    counts = [_get_cached_num_tokens(key) for key in keys]
+    missing = [i for i, num_tokens in enumerate(counts) if num_tokens is None]
+    if missing:
+        encoded = get_encoding(encoding_name).encode_batch(
+            [strings[i] for i in missing], num_threads=num_threads
+        )
+        for i, tokens in zip(missing, encoded):
+            counts[i] = len(tokens)
+            _set_cached_num_tokens(keys[i], counts[i])
+    return counts
+
+SHARED_DOC_TYPES = ("txt", "doc", "ppt")
+
+def iter_shared_docs(
+    jsondict,
+    doc_types: Tuple[str, ...] = SHARED_DOC_TYPES,
+    slide_separator: str = chunker.SLIDE_SEPARATOR,
+) -> Iterator[Dict[str, str]]:
+    """
+    Yield the shared documents of a meeting (DATA/AMI_MS or DATA/AMI_MS_RAG_Cleaned) one by one
+    as {"type", "filename", "content"}, the slides of a raw ppt are joined into one text with slide_separator
+    (chunker.SLIDE_SEPARATOR keeps the slide boundaries for chunking('SlideSplitter')).
+    The cleaned files already hold each ppt as one text, its slides are not separated anymore.
+    Meetings without shared documents hold None and yield nothing.
+    """
+    for doc_type in doc_types:
+        for x in jsondict['shared-doc'][doc_type] or []:
+            if doc_type == 'ppt' and isinstance(x['content'], dict):
+                string = ['\n'.join(v) for k,v in x['content'].items()]
+                content = slide_separator.join(string)
+            else:
+                content = x['content']
+            yield {"type": doc_type, "filename": x['filename'], "content": content}
+
+def format_shared_doc(doc: Dict[str, str]) -> str:
+    return f'{doc["filename"]} \n ------------ \n {doc["content"]}'
+
 def get_text_from_txt(jsondict):
-    outputs = []
-    for x in jsondict['shared-doc']['txt']:
-        filename = x['filename']
-        content = x['content']
-        o = f'{filename} \n ------------ \n {content}'
-        outputs.append(o)
-    outputs = '\n'.join(outputs)
-    return outputs
+    return '\n'.join(format_shared_doc(doc) for doc in iter_shared_docs(jsondict, ('txt',)))
 
 def get_text_from_doc(jsondict):
-    outputs = []
-    for x in jsondict['shared-doc']['doc']:
-        filename = x['filename']
-        content = x['content']
-        o = f'{filename} \n ------------ \n {content}'
-        outputs.append(o)
-    outputs = '\n'.join(outputs)
-    return outputs
+    return '\n'.join(format_shared_doc(doc) for doc in iter_shared_docs(jsondict, ('doc',)))
 
 def get_text_from_ppt(jsondict):
-    outputs = []
-    for x in jsondict['shared-doc']['ppt']:
-        filename = x['filename']
-        string = ['\n'.join(v) for k,v in x['content'].items()]
-        content = '\n'.join(string)
-        o = f'{filename} \n ------------ \n {content}'
-        outputs.append(o)
-    outputs = '\n'.join(outputs)
-    return outputs 
-
-def truncate_shared_docs(shared_docs: str, max_tokens: int = 90000) -> str:
+    return '\n'.join(format_shared_doc(doc) for doc in iter_shared_docs(jsondict, ('ppt',)))
+
+def truncate_by_tokens(
+    text: str,
+    max_tokens: int,
+    strategy: str = "head",
+    encoding_name: str = "cl100k_base",
+) -> Tuple[str, int]:
+    """
+    Truncate a text to at most max_tokens tokens. The text is encoded once and cut at a token offset.
+    Args:
+        text (str): The text to truncate.
+        max_tokens (int): The maximum number of tokens allowed.
+        strategy (str): Which part of the text to keep.
+            'head' keeps the beginning, 'tail' keeps the end,
+            'middle' keeps the beginning and the end and drops the middle (middle-out).
+        encoding_name (str): The tiktoken encoding.
+    Returns:
+        Tuple[str, int]: The truncated text and the number of dropped tokens.
+    """
+    if strategy not in TRUNCATE_STRATEGIES:
+        raise ValueError(f"Strategy must be one of {TRUNCATE_STRATEGIES}, got {strategy}")
+    encoding = get_encoding(encoding_name)
+    tokens = encoding.encode(text)
+    max_tokens = max(max_tokens, 0)
+    dropped = len(tokens) - max_tokens
+    if dropped <= 0:
+        return text, 0
+    if strategy == "head":
+        kept = tokens[:max_tokens]
+    elif strategy == "tail":
+        kept = tokens[len(tokens) - max_tokens:]
+    else:
+        head = (max_tokens + 1) // 2
+        kept = tokens[:head] + tokens[len(tokens) - (max_tokens - head):]
+    # A cut can split a multi-byte character, drop the incomplete bytes instead of emitting U+FFFD
+    truncated = encoding.decode_bytes(kept).decode("utf-8", errors="ignore")
+    return truncated, dropped
+
+def truncate_shared_docs(shared_docs: str, max_tokens: int = 90000, strategy: str = "head") -> str:
     """
     Truncate the shared documents to ensure the number of tokens is less than max_tokens.
     Args:
         shared_docs (str): The shared documents as a string.
         max_tokens (int): The maximum number of tokens allowed.
+        strategy (str): 'head', 'tail' or 'middle', see truncate_by_tokens.
     Returns:
         str: The truncated shared documents.
     """
-    # Ensure the shared documents are within the token limit
-    while num_tokens_from_string(shared_docs) > max_tokens:
-        shared_docs = shared_docs[:-1000]  # Truncate the last 1000 characters iteratively
-    return shared_docs
+    truncated, _ = truncate_by_tokens(shared_docs, max_tokens, strategy=strategy)
+    return truncated
 
 def load_data_with_shared_doc_path(path: str = "EDA/token_data.csv") -> pd.DataFrame:
     """
@@ -150,11 +269,69 @@ def load_data_with_shared_doc_path(path: str = "EDA/token_data.csv") -> pd.DataF
     df_shared_docs = df[df["num_tokens_shared_doc"] > 0]
     return df_shared_docs
 
-def extract_data_from_file(file: str, root: str = '/datadrive/CuongHV/project/DATA/AMI_MS_Cleaned') -> pd.DataFrame:
+def read_json_keys(path: str, keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Stream a json file and build only the requested top-level keys, the other values are skipped
+    without being materialized. Stops reading once every key is found.
+    """
+    wanted = set(keys)
+    found: Dict[str, Any] = {}
+    current, builder = None, None
+    with open(path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if current is None:
+                if prefix == '' and event == 'map_key' and value in wanted:
+                    current, builder = value, ijson.ObjectBuilder()
+                continue
+            builder.event(event, value)
+            if prefix == current and event in _SCALAR_EVENTS:
+                found[current] = builder.value
+                current = None
+                if len(found) == len(wanted):
+                    break
+    return found
+
+class LazyJSON(Mapping):
+    """
+    Read-only mapping over some top-level keys of a json file.
+    Nothing is read until the first access, then every requested key is built in one streaming pass.
+    A requested key missing from the file raises KeyError like a dict.
+    """
+
+    def __init__(self, path: str, keys: Iterable[str]):
+        self.path = path
+        self.keys_ = tuple(keys)
+        self._data: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = read_json_keys(self.path, self.keys_)
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.keys_:
+            raise KeyError(f"{key} was not requested from {self.path}, requested keys: {self.keys_}")
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+def extract_data_from_file(
+    file: str,
+    root: str = '/datadrive/CuongHV/project/DATA/AMI_MS_Cleaned',
+    keys: Optional[Iterable[str]] = None,
+):
     """
     Extract the data from the file
+    With keys, only these top-level keys are parsed (see LazyJSON), e.g. keys=('transcript', 'summary')
+    skips the large pens/whiteboard arrays.
     """
     path = f'{root}/{file}'
+    if keys is not None:
+        return LazyJSON(path, keys)
     with open(path, encoding='utf-8') as f:
         jsondict = json.load(f)
     return jsondict
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+from src.service.batch_generate import CHECKPOINT_FILE, BatchGenerator, Checkpoint, STRATEGIES
+
+
+class FakeGeneration:
+    def __init__(self):
+        self.calls = []
+
+    def generate_recap_agenda(self, llm, params, **inputs):
+        self.calls.append(inputs)
+        return {"text": f"1. {inputs['summary']}"}
+
+
+def test_checkpoint_resume(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path))
+    (tmp_path / "ES2002a.json").write_text("{}")
+    checkpoint.record("ES2002a.json", "done")
+    checkpoint.record("ES2002b.json", "failed", "boom")
+    checkpoint.record("ES2002c.json", "done")  # output file missing
+    with open(tmp_path / CHECKPOINT_FILE, "a") as f:
+        f.write('{"file": "ES2002d.json", "sta')  # partial line of a crash
+
+    resumed = Checkpoint(str(tmp_path))
+    assert resumed.is_done("ES2002a.json")
+    assert not resumed.is_done("ES2002b.json")
+    assert not resumed.is_done("ES2002c.json")
+    assert "ES2002d.json" not in resumed.status
+
+
+def test_run_skips_done_meetings(tmp_path):
+    generate = FakeGeneration()
+    build_inputs = lambda file: ({"transcript": "t", "summary": file}, {"summary": file})
+    files = ["ES2002a.json", "ES2002b.json"]
+
+    first = BatchGenerator(generate, llm=None, strategy="generate_recap_agenda", output_dir=str(tmp_path))
+    assert asyncio.run(first.run(files[:1], build_inputs)) == {"ES2002a.json": "done"}
+    second = BatchGenerator(generate, llm=None, strategy="generate_recap_agenda", output_dir=str(tmp_path))
+    assert asyncio.run(second.run(files, build_inputs)) == {"ES2002a.json": "done", "ES2002b.json": "done"}
+
+    assert [inputs["summary"] for inputs in generate.calls] == files
+    with open(os.path.join(tmp_path, "ES2002b.json"), encoding="utf-8") as f:
+        assert json.load(f) == {"summary": "ES2002b.json", "agenda": "1. ES2002b.json"}
+
+
+def test_category_strategies_save_the_same_fields(tmp_path):
+    (tmp_path / "ES2002a.json").write_text(json.dumps({"qa": {"Goal?": "Design"}}))
+    args = SimpleNamespace(qa_root=str(tmp_path))
+    inputs, saved = STRATEGIES["generate_category_rag_multi_input_agenda"]("ES2002a.json", args)
+    assert saved["category"] == inputs["category"] == "Project Kick-off"
+    assert saved["description"] == inputs["description"]
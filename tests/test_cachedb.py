@@ -0,0 +1,34 @@
+import itertools
+
+import pytest
+
+from src.driver import cachedb
+from src.driver.cachedb import SQLiteResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"time": 1000.0}
+    ticks = itertools.count()
+    # Every call is one step later, so the access order is never a tie
+    monkeypatch.setattr(cachedb.time, "time", lambda: now["time"] + next(ticks) * 0.001)
+    return now
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"), ttl=60)
+    cache.set("key", {"content": "answer"})
+    assert cache.get("key") == {"content": "answer"}
+    clock["time"] += 61
+    assert cache.get("key") is None and len(cache) == 0
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_the_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2)
+    cache.set("a", {"content": "a"})
+    cache.set("b", {"content": "b"})
+    cache.get("a")
+    cache.set("c", {"content": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"content": "a"} and cache.get("c") == {"content": "c"}
@@ -0,0 +1,42 @@
+from src.utils import chunker, utils
+
+
+def _words(text):
+    return len(text.split())
+
+
+def _assert_offsets(text, documents):
+    for doc in documents:
+        start = doc.metadata["start_index"]
+        assert text[start:start + len(doc.page_content)] == doc.page_content
+
+
+def test_token_splitter_offsets_on_repeated_text():
+    text = "the remote control. " * 12
+    splitter = chunker.TokenTextSplitter(chunk_size=7, chunk_overlap=3, length_function=_words)
+    documents = splitter.create_documents([text])
+    assert len(documents) > 3
+    _assert_offsets(text, documents)
+    # A match of the same words earlier in the text is not the chunk: the chunks must reach the end of the text
+    last = documents[-1]
+    assert last.metadata["start_index"] + len(last.page_content) == len(text.rstrip())
+
+
+def test_turn_window_offsets_on_repeated_turns():
+    text = "\n".join(["Okay.", "Okay.", "Let's start.", "Okay.", "Okay."] * 3)
+    splitter = chunker.TurnWindowSplitter(chunk_size=3, chunk_overlap=0, overlap_turns=1, length_function=_words)
+    documents = splitter.create_documents([text])
+    _assert_offsets(text, documents)
+    last = documents[-1]
+    assert last.metadata["start_index"] + len(last.page_content) == len(text)
+
+
+def test_three_slide_ppt_yields_three_chunks(monkeypatch):
+    monkeypatch.setattr(utils, "num_tokens_from_string", _words)
+    jsondict = {"shared-doc": {"txt": None, "doc": None, "ppt": [
+        {"filename": "design.ppt", "content": {"0": ["Design"], "1": ["Method", "Feedback"], "2": ["Next steps"]}},
+    ]}}
+    doc = next(utils.iter_shared_docs(jsondict))
+    documents = utils.chunking_for_source(doc["type"]).create_documents([doc["content"]])
+    assert [d.page_content for d in documents] == ["Design", "Method\nFeedback", "Next steps"]
+    _assert_offsets(doc["content"], documents)
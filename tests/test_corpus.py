@@ -0,0 +1,41 @@
+import json
+
+from src.utils import corpus, utils
+
+RAW_MEETING = {
+    "transcript": "Okay. Welcome.",
+    "summary": "Kick-off.",
+    "shared-doc": {
+        "txt": [{"filename": "notes.txt", "content": "Remote control"}],
+        "doc": None,
+        "ppt": [{"filename": "design.ppt", "content": {"0": ["Design"], "1": ["Method", "Feedback"]}}],
+    },
+}
+
+
+def _ingest(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "num_tokens_from_strings", lambda strings, *args, **kwargs: [len(s.split()) for s in strings])
+    return corpus.ingest(str(tmp_path / "meetings"), str(tmp_path / "corpus.parquet"), num_workers=2)
+
+
+def test_raw_shared_docs_are_joined_as_text(tmp_path, monkeypatch):
+    (tmp_path / "meetings").mkdir()
+    (tmp_path / "meetings" / "ES2002a.json").write_text(json.dumps(RAW_MEETING))
+    _ingest(tmp_path, monkeypatch)
+    row = corpus.load_corpus(["shared_docs"], path=str(tmp_path / "corpus.parquet")).iloc[0]
+    expected = "\n".join(utils.format_shared_doc(doc) for doc in utils.iter_shared_docs(RAW_MEETING))
+    assert row["shared_docs"] == expected
+    assert "{" not in row["shared_docs"]
+
+
+def test_ingest_only_parses_changed_meetings(tmp_path, monkeypatch):
+    (tmp_path / "meetings").mkdir()
+    for name in ("ES2002a.json", "ES2002b.json"):
+        (tmp_path / "meetings" / name).write_text(json.dumps(RAW_MEETING))
+    assert _ingest(tmp_path, monkeypatch) == {"added": 2, "updated": 0, "unchanged": 0, "removed": 0}
+
+    (tmp_path / "meetings" / "ES2002b.json").write_text(json.dumps({**RAW_MEETING, "summary": "Design."}))
+    (tmp_path / "meetings" / "ES2002a.json").unlink()
+    assert _ingest(tmp_path, monkeypatch) == {"added": 0, "updated": 1, "unchanged": 0, "removed": 1}
+    df = corpus.load_corpus(["summary"], path=str(tmp_path / "corpus.parquet"))
+    assert df.to_dict("records") == [{"meeting_id": "ES2002b", "summary": "Design."}]
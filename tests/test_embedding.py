@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import embedding
+from src.utils.embedding import VectorDB
+
+
+class FakeTenant:
+    """One tenant of a collection: server-side grouping, offset and cursor queries."""
+
+    def __init__(self, properties):
+        self.objects = [SimpleNamespace(uuid=i, properties=props) for i, props in enumerate(properties)]
+        self.aggregate = SimpleNamespace(over_all=self.over_all)
+        self.query = SimpleNamespace(fetch_objects=self.fetch_objects)
+
+    def over_all(self, group_by=None, total_count=False):
+        if group_by is None:
+            return SimpleNamespace(total_count=len(self.objects))
+        values = dict.fromkeys(ob.properties[group_by.prop] for ob in self.objects if group_by.prop in ob.properties)
+        return SimpleNamespace(groups=[SimpleNamespace(grouped_by=SimpleNamespace(value=v)) for v in values])
+
+    def fetch_objects(self, limit, offset=None, after=None, include_vector=False, return_properties=None):
+        if offset is not None and offset + limit > embedding.QUERY_MAXIMUM_RESULTS:
+            raise ValueError("query maximum results exceeded")
+        start = offset or (after + 1 if after is not None else 0)
+        return SimpleNamespace(objects=self.objects[start:start + limit])
+
+
+def _db(monkeypatch, tenant):
+    client = SimpleNamespace(collections=SimpleNamespace(
+        get=lambda name: SimpleNamespace(with_tenant=lambda tenant_name: tenant)))
+
+    @contextmanager
+    def managed_client():
+        yield client
+
+    monkeypatch.setattr(embedding, "managed_client", managed_client)
+    return VectorDB.__new__(VectorDB)
+
+
+def test_sources_are_read_under_the_ingest_key_by_default(monkeypatch):
+    db = _db(monkeypatch, FakeTenant([{"filename": "notes.txt"}, {"filename": "slides.ppt"}, {"filename": "notes.txt"}]))
+    assert db.get_all_source_from_tenant("tenant", "Index") == (["notes.txt", "slides.ppt"], "")
+
+
+def test_sources_are_read_under_another_metadata_key(monkeypatch):
+    db = _db(monkeypatch, FakeTenant([{"source": "report.pdf"}, {"source": "report.pdf"}]))
+    assert db.get_all_source_from_tenant("tenant", "Index", metadata_key="source") == (["report.pdf"], "")
+
+
+@pytest.mark.parametrize("count", [50, 25000])
+def test_sample_reaches_past_the_offset_cap(monkeypatch, count):
+    monkeypatch.setattr(embedding, "QUERY_MAXIMUM_RESULTS", 100)
+    db = _db(monkeypatch, FakeTenant([{"text": str(i)} for i in range(count)]))
+    seen = set()
+    for _ in range(40):
+        sample = db.sample_tenant_objects("tenant", "Index", k=5)
+        assert len(sample) == len({ob.uuid for ob in sample}) == 5
+        seen.update(ob.uuid for ob in sample)
+    assert max(seen) < count
+    if count > 100:
+        assert max(seen) >= 100
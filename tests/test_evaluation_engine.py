@@ -0,0 +1,47 @@
+import asyncio
+
+from evaluation.engine import Job, RateLimiter, evaluate, retry_after, run_jobs
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_rate_limited_calls_are_retried_other_errors_get_the_default():
+    attempts = {}
+
+    async def call(prompt):
+        attempts[prompt] = attempts.get(prompt, 0) + 1
+        if prompt == "busy" and attempts[prompt] < 3:
+            raise RateLimitError("retryDelay: 0s")
+        if prompt == "broken":
+            raise ValueError("bad request")
+        return f"answer to {prompt}"
+
+    jobs = [Job(key=prompt, prompt=prompt) for prompt in ("busy", "broken", "fine")]
+    results = evaluate(call, jobs, default=None)
+    assert results == {"busy": "answer to busy", "broken": None, "fine": "answer to fine"}
+    assert attempts == {"busy": 3, "broken": 1, "fine": 1}
+
+
+def test_retry_after_reads_the_provider_delay():
+    assert retry_after(RateLimitError("429 {'retryDelay': '12s'}")) == 12.0
+    assert retry_after(RateLimitError("429 Too Many Requests")) is None
+
+
+def test_workers_bound_the_calls_in_flight_and_report_each_result():
+    in_flight, peak, reported = 0, 0, []
+
+    async def call(prompt):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return prompt.upper()
+
+    jobs = [Job(key=i, prompt=f"p{i}") for i in range(10)]
+    results = asyncio.run(run_jobs(call, jobs, RateLimiter(), max_workers=3,
+                                   on_result=lambda job, response: reported.append(job.key)))
+    assert peak == 3 and sorted(reported) == list(range(10))
+    assert results == {i: f"P{i}" for i in range(10)}
@@ -0,0 +1,62 @@
+import asyncio
+
+import pandas as pd
+
+from evaluation.backends import Judge
+from evaluation.pipeline import CsvResultWriter, judge_all
+
+CRITERIA = {"OOO": "Overall quality", "REL_DOC": "Relevance to the documents"}
+ROLES = {"Unknown Role"}
+
+
+class FakeJudge(Judge):
+    """Scores 4, or answers without a JSON object for the transcripts containing 'garbled'."""
+
+    def __init__(self):
+        super().__init__("fake", "fake-model")
+        self.prompts = []
+
+    async def acall(self, prompt, json_output=False):
+        self.prompts.append(str(prompt))
+        return "I cannot score this." if "garbled" in str(prompt) else '```json\n{"score": 4}\n```'
+
+
+def _items(*names, garbled=()):
+    return {
+        name: {"agenda": f"Agenda of {name}", "transcript": "garbled" if name in garbled else f"Transcript of {name}",
+               "related_docs": f"Docs of {name}"}
+        for name in names
+    }
+
+
+def test_writer_skips_written_items_and_keeps_failed_ones_out(tmp_path):
+    path = str(tmp_path / "scores.csv")
+    writer = CsvResultWriter(path, CRITERIA, ROLES)
+    writer.add("a.json", "Agenda a", {"OOO": 4, "REL_DOC": 3})
+    writer.add("b.json", "Agenda b", {"OOO": 0}, failed=True)
+    writer.add("b.json", "Agenda b", {"REL_DOC": 5})
+    assert list(pd.read_csv(path)["Item"]) == ["a.json"]
+
+    writer = CsvResultWriter(path, CRITERIA, ROLES)
+    assert writer.done == {"a.json"}
+    writer.add("b.json", "Agenda b", {"OOO": 2, "REL_DOC": 5})
+    assert list(pd.read_csv(path)["Item"]) == ["a.json", "b.json"]
+
+    # --overwrite starts a new file
+    writer = CsvResultWriter(path, CRITERIA, ROLES, resume=False)
+    assert writer.done == set() and open(path).read() == ""
+
+
+def test_rerun_only_judges_the_items_missing_from_the_csv(tmp_path):
+    path = str(tmp_path / "scores.csv")
+    judge = FakeJudge()
+    writers = {"fake": CsvResultWriter(path, CRITERIA, ROLES)}
+    asyncio.run(judge_all([judge], _items("a.json", "b.json", garbled=("b.json",)), CRITERIA, writers))
+    assert list(pd.read_csv(path)["Item"]) == ["a.json"]
+    assert len(judge.prompts) == 4
+
+    judge = FakeJudge()
+    writers = {"fake": CsvResultWriter(path, CRITERIA, ROLES)}
+    asyncio.run(judge_all([judge], _items("a.json", "b.json"), CRITERIA, writers))
+    assert list(pd.read_csv(path)["Item"]) == ["a.json", "b.json"]
+    assert len(judge.prompts) == 2 and all("Transcript of a.json" not in prompt for prompt in judge.prompts)
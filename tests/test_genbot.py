@@ -0,0 +1,20 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.service.genbot import Simple_Assistance
+
+
+def _assistant(responses):
+    return Simple_Assistance("Agenda of: {content}", "meeting", FakeListChatModel(responses=responses))
+
+
+def test_batch_empty_inputs_list_makes_no_call():
+    assistant = _assistant([])  # any llm call would fail on the empty response list
+    assert assistant.batch([]) == []
+    assert asyncio.run(assistant.abatch([])) == []
+
+
+def test_batch_defaults_to_instance_inputs():
+    responses = _assistant(["1. Intro"]).batch()
+    assert [response["text"] for response in responses] == ["1. Intro"]
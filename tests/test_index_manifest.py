@@ -0,0 +1,54 @@
+import pytest
+
+from src.utils import utils
+from src.utils.embedding import VectorDB
+from src.utils.index_manifest import IndexManifest, chunk_keys
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(utils, "num_tokens_from_string", lambda text: len(text.split()))
+
+
+class FakeVectorDB(VectorDB):
+    """sync_meeting_to_db without Weaviate: inserts and deletes are recorded."""
+
+    def __init__(self):
+        self.inserted, self.deleted = [], []
+
+    def bulk_import_to_db(self, tenant_documents, index_name="", text_key="text", split=True, ids=None, **kwargs):
+        for tenant_name, documents in tenant_documents.items():
+            self.inserted.extend(doc.page_content for doc in documents)
+        return {tenant_name: list(ids[tenant_name]) for tenant_name in tenant_documents}, []
+
+    def delete_id_from_vectordb(self, index_name=None, text_key="text", tenant_name="Admin", ids=[]):
+        self.deleted.extend(ids)
+
+
+def test_chunk_keys_keep_repeated_chunks_apart():
+    keys = chunk_keys(["a", "b", "a"])
+    assert len(set(keys)) == 3 and keys[0].split(":")[0] == keys[2].split(":")[0]
+
+
+def test_sync_only_embeds_new_chunks_and_deletes_removed_ones(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    db = FakeVectorDB()
+    stats = db.sync_meeting_to_db("ES2002a.json", {"notes.txt": "Intro", "old.txt": "Budget"}, manifest, index_name="Index")
+    assert stats["inserted"] == 2 and sorted(db.inserted) == ["Budget", "Intro"]
+    old_uuids = set(manifest.chunks("ES2002a.json", "old.txt").values())
+
+    # Reloaded from disk: the unchanged source is skipped, the removed one is deleted
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    db = FakeVectorDB()
+    stats = db.sync_meeting_to_db("ES2002a.json", {"notes.txt": "Intro", "new.txt": "Design"}, manifest, index_name="Index")
+    assert db.inserted == ["Design"]
+    assert set(db.deleted) == old_uuids
+    assert stats["unchanged"] == 1 and stats["tenant"] == manifest.tenant("ES2002a.json")
+    assert manifest.sources("ES2002a.json") == ["notes.txt", "new.txt"]
+
+
+def test_sync_with_a_source_missing_from_source_types(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    db = FakeVectorDB()
+    db.sync_meeting_to_db("ES2002a.json", {"notes.txt": "Intro"}, manifest, index_name="Index", source_types={})
+    assert db.inserted == ["Intro"]
@@ -0,0 +1,33 @@
+from langchain_core.embeddings import Embeddings
+
+from src.driver.cachedb import SQLiteEmbeddingStore
+from src.utils import question_sets
+from src.utils.embedding import CachedEmbeddings
+
+
+class FakeEmbeddings(Embeddings):
+    model = "fake-embedding"
+
+    def __init__(self):
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return [[float(len(text)), 0.0] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text)), 1.0]
+
+
+def test_questions_embedded_through_a_cached_model_share_its_query_namespace(tmp_path):
+    model = FakeEmbeddings()
+    cached = CachedEmbeddings(model, SQLiteEmbeddingStore(str(tmp_path / "embeddings.sqlite")))
+    questions = ["What was decided?", "Who attended?"]
+
+    vectors = question_sets.embed_questions(questions, cached)
+    assert vectors == [[17.0, 1.0], [13.0, 1.0]] and model.queries == questions
+
+    # Same store and namespace: neither path sends the questions again
+    assert question_sets.embed_questions(questions, cached) == vectors
+    assert cached.embed_query("Who attended?") == [13.0, 1.0]
+    assert model.queries == questions
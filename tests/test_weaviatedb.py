@@ -0,0 +1,46 @@
+from src.driver import weaviatedb, weaviatepool
+
+
+class FakeClient:
+    live = True
+
+    def is_live(self):
+        return self.live
+
+    def close(self):
+        pass
+
+
+class FakeVectorStore:
+    built = 0
+
+    def __init__(self, client, **kwargs):
+        FakeVectorStore.built += 1
+        self.client = client
+
+
+def _db(monkeypatch, pool):
+    monkeypatch.setenv("WEAVIATE_HOST", "weaviate.test")
+    monkeypatch.setattr(weaviatepool, "get_pool", lambda *args, **kwargs: pool)
+    monkeypatch.setattr(weaviatedb, "WeaviateLC", FakeVectorStore)
+    FakeVectorStore.built = 0
+    return weaviatedb.WeaviateDB()
+
+
+def test_vectorstore_is_reused_across_pooled_clients(monkeypatch):
+    db = _db(monkeypatch, weaviatepool.WeaviateClientPool(FakeClient, size=2))
+    embedding = object()
+    first = db.get_langchain_vectorstore("Index", "text", embedding, as_retriever=False)
+    for _ in range(5):
+        assert db.get_langchain_vectorstore("Index", "text", embedding, as_retriever=False) is first
+    assert FakeVectorStore.built == 1
+
+
+def test_vectorstore_is_rebuilt_on_an_invalidated_client(monkeypatch):
+    pool = weaviatepool.WeaviateClientPool(FakeClient, size=2)
+    db = _db(monkeypatch, pool)
+    first = db.get_langchain_vectorstore("Index", "text", None, as_retriever=False)
+    pool.invalidate(first.client)
+    second = db.get_langchain_vectorstore("Index", "text", None, as_retriever=False)
+    assert second is not first and second.client is not first.client
+    assert db.get_langchain_vectorstore("Index", "text", None, as_retriever=False) is second